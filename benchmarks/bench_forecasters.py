@@ -0,0 +1,101 @@
+"""Compare forecast accuracy against fit time on recorded sensor traces.
+
+Usage:
+    python benchmarks/bench_forecasters.py --db sensor_history.db
+    python benchmarks/bench_forecasters.py --csv export.csv --horizon 10 --json results.json
+
+Traces come from the SensorInterface SQLite history or from a SAVE export
+(.csv/.parquet/.xlsx). Each forecaster is fitted at several cut points
+(rolling origin) and scored by its mean absolute error over the next
+``--horizon`` readings.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sensor_forecasters import FORECASTERS, make_forecaster  # noqa: E402
+from sensor_schema import pick_device  # noqa: E402
+
+SENSORS = ["LIGHT INTENSITY", "GAS VALUE", "HUMIDITY", "TEMPERATURE", "PITCH", "ROLL", "YAW"]
+
+
+def load_traces(args):
+    if args.db:
+        with closing(sqlite3.connect(args.db)) as conn:
+            quoted = ", ".join(f'"{col}"' for col in ["DEVICE"] + SENSORS)
+            where, params = ('WHERE "DEVICE" = ?', (args.device,)) if args.device else ("", ())
+            frame = pd.read_sql_query(f'SELECT {quoted} FROM readings {where} ORDER BY id', conn, params=params)
+    elif args.csv:
+        extension = os.path.splitext(args.csv)[1].lower()
+        reader = {".parquet": pd.read_parquet, ".xlsx": pd.read_excel}.get(extension, pd.read_csv)
+        frame = reader(args.csv)
+    else:
+        raise SystemExit("Pass --db or --csv with recorded sensor data.")
+    # Interleaved boards would make one sawtooth trace, so benchmark exactly one
+    try:
+        device = pick_device(frame["DEVICE"].unique().tolist() if "DEVICE" in frame else [], args.device)
+    except ValueError as e:
+        raise SystemExit(f"{e} (use --device)" if args.device is None else str(e))
+    if device is not None:
+        frame = frame[frame["DEVICE"] == device]
+    return frame[SENSORS].to_numpy(dtype=np.float64)[-args.max_rows:]
+
+
+def evaluate(name, values, horizon, origins):
+    fit_times, errors = [], []
+    for origin in origins:
+        start = time.perf_counter()
+        forecaster = make_forecaster(name).fit(values[:origin])
+        predicted = forecaster.forecast(horizon)
+        fit_times.append(time.perf_counter() - start)
+        errors.append(np.nanmean(np.abs(predicted - values[origin:origin + horizon]), axis=0))
+    mae = np.nanmean(errors, axis=0)
+    return {
+        "forecaster": name,
+        "fit_seconds_median": float(np.median(fit_times)),
+        "mae_mean": float(np.nanmean(mae)),
+        "mae_per_sensor": dict(zip(SENSORS, map(float, mae))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="SensorInterface history database (sensor_history.db)")
+    parser.add_argument("--csv", help="exported trace (.csv, .parquet or .xlsx)")
+    parser.add_argument("--device", help="only use readings from this DEVICE")
+    parser.add_argument("--horizon", type=int, default=10)
+    parser.add_argument("--origins", type=int, default=5, help="number of rolling cut points")
+    parser.add_argument("--max-rows", type=int, default=43200)
+    parser.add_argument("--forecasters", nargs="+", default=list(FORECASTERS))
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    values = load_traces(args)
+    if len(values) < 2 * args.horizon + 50:
+        raise SystemExit(f"Not enough readings to benchmark ({len(values)}).")
+    first = len(values) // 2
+    origins = np.linspace(first, len(values) - args.horizon, args.origins).astype(int)
+
+    results = [evaluate(name, values, args.horizon, origins) for name in args.forecasters]
+
+    print(f"{len(values)} readings, horizon {args.horizon}, {len(origins)} origins")
+    print(f"{'forecaster':<16}{'fit time (s)':>14}{'mean MAE':>12}")
+    for result in results:
+        print(f"{result['forecaster']:<16}{result['fit_seconds_median']:>14.4f}{result['mae_mean']:>12.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": len(values), "horizon": args.horizon, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
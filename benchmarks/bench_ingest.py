@@ -0,0 +1,207 @@
+"""Benchmark the ingest -> store -> display path against a simulated ESP32 fleet.
+
+Usage:
+    python benchmarks/bench_ingest.py --devices 50 --rate 5 --duration 30
+    python benchmarks/bench_ingest.py --devices 200 --rate 2 --json ingest.json
+    python benchmarks/bench_ingest.py --serve-only --devices 4
+
+Each fake board (``sensor_simulator.FakeBoard``) listens on its own local port and answers ``/getSensorData``
+with the same JSON keys robot.ino sends. A SensorService polls the fleet
+exactly as it would poll real boards (optionally persisting to a temporary
+SQLite history), while the main thread renders headless frames: the visible
+table rows are formatted and a live line chart is drawn with matplotlib's Agg
+backend, the same work the Tk dashboard does per refresh.
+
+Reported: ingested samples/sec, end-to-end latency from the board answering
+to the reading being stored (p50/p90/p99/max), frame time and data age at each
+frame, and process memory sampled once a second. ``--serve-only`` just runs
+the fleet and prints the addresses to paste into the dashboard.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from sensor_plots import minmax_decimate  # noqa: E402
+from sensor_poller import make_device  # noqa: E402
+from sensor_schema import CHANNELS, format_column, now_ms  # noqa: E402
+from sensor_service import SensorService  # noqa: E402
+from sensor_simulator import FakeFleet  # noqa: E402
+
+
+class HeadlessFrame:
+    """The per-refresh work of the dashboard without a window: table text plus an Agg-rendered line chart."""
+
+    def __init__(self, store, columns, visible_rows=15, window_rows=1800, max_points=600):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.store = store
+        self.columns = columns
+        self.visible_rows = visible_rows
+        self.window_rows = window_rows
+        self.max_points = max_points
+        self.figure = Figure(figsize=(8, 6))
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.lines = {ch: self.ax.plot([], [])[0] for ch in CHANNELS}
+        self.ax.set_xlim(-window_rows, 0)
+
+    def render(self):
+        _, columns = self.store.view()
+        rows = list(zip(*(format_column(col, columns[col][-self.visible_rows:]) for col in self.columns)))
+        for ch, line in self.lines.items():
+            values = np.asarray(columns[ch][-self.window_rows:], dtype=np.float64)
+            line.set_data(*minmax_decimate(np.arange(-len(values) + 1, 1), values, self.max_points))
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        self.canvas.draw()
+        timestamps = columns["TIMESTAMP"]
+        return len(rows), (now_ms() - int(timestamps[-1])) if len(timestamps) else None
+
+
+def rss_bytes():
+    """Current resident set size (peak size where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentiles(values, scale=1.0):
+    if not len(values):
+        return None
+    values = np.asarray(values, dtype=np.float64) * scale
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99), "max": float(values.max()), "count": len(values)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    fleet = FakeFleet(args.devices, args.error_rate, args.board_delay).start()
+    devices = [make_device(host, interval=1.0 / args.rate, timeout=args.timeout) for host in fleet.hosts]
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = None if args.no_db else os.path.join(tmp, "history.db")
+        service = SensorService(devices, database_path, args.retention)
+
+        latencies = []
+
+        def timed(device_id, payload):
+            service.handle_sensor_data(device_id, payload)
+            sent = fleet.board(device_id).sent.pop(payload["moisture"], None)
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
+
+        service.poller.on_reading = timed
+        frame = None
+        if args.fps > 0:
+            try:
+                frame = HeadlessFrame(service.store, service.columns)
+            except ImportError:
+                print("matplotlib is not installed; skipping frame timings", file=sys.stderr)
+
+        frame_times, data_ages, memory = [], [], []
+        base_rss = rss_bytes()
+        service.start()
+        started = time.perf_counter()
+        next_frame = next_sample = started
+        while (now := time.perf_counter()) < started + args.duration:
+            if now >= next_sample:
+                memory.append({"seconds": round(now - started, 3), "rss_mb": rss_bytes() / 2 ** 20,
+                               "rows": service.store.appended})
+                next_sample += 1.0
+            if frame is not None and now >= next_frame:
+                begin = time.perf_counter()
+                _, age = frame.render()
+                frame_times.append(time.perf_counter() - begin)
+                if age is not None:
+                    data_ages.append(age)
+                next_frame += 1.0 / args.fps
+            time.sleep(max(0.0, min(next_frame if frame else next_sample, next_sample) - time.perf_counter()))
+        elapsed = time.perf_counter() - started
+        ingested = service.store.appended
+        service.stop()
+
+    seconds = np.array([m["seconds"] for m in memory])
+    rss = np.array([m["rss_mb"] for m in memory])
+    growth = float(np.polyfit(seconds, rss, 1)[0] * 60) if len(memory) > 2 else None
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "serve_only")},
+        "expected_samples_per_sec": args.devices * args.rate,
+        "samples": ingested,
+        "samples_per_sec": ingested / elapsed,
+        "served": sum(board.seq for board in fleet.boards),
+        "latency_ms": percentiles(latencies, 1000),
+        "frame_ms": percentiles(frame_times, 1000),
+        "data_age_ms": percentiles(data_ages),
+        "memory": {"baseline_mb": base_rss / 2 ** 20, "growth_mb_per_min": growth, "samples": memory},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0.5, help="polls per second per device")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to measure")
+    parser.add_argument("--timeout", type=float, default=1.5, help="poll timeout in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of polls a board answers with 500")
+    parser.add_argument("--board-delay", type=float, default=0.0, help="seconds a board takes to answer")
+    parser.add_argument("--retention", type=int, default=43200, help="rows kept in memory")
+    parser.add_argument("--no-db", action="store_true", help="skip the SQLite history")
+    parser.add_argument("--fps", type=float, default=2.0, help="headless frames per second (0 disables)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--serve-only", action="store_true", help="only run the fake fleet")
+    args = parser.parse_args()
+
+    if args.serve_only:
+        fleet = FakeFleet(args.devices, args.error_rate, args.board_delay).start()
+        print(",".join(fleet.hosts), flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    results = run(args)
+    print(f"{args.devices} devices at {args.rate:g} Hz for {args.duration:g}s (rev {results['revision']})")
+    print(f"samples/sec     {results['samples_per_sec']:10.1f}  (expected {results['expected_samples_per_sec']:g}, "
+          f"{results['samples']} stored of {results['served']} served)")
+    for key in ("latency_ms", "frame_ms", "data_age_ms"):
+        stats = results[key]
+        if stats:
+            print(f"{key:<16}p50 {stats['p50']:8.2f}  p90 {stats['p90']:8.2f}  p99 {stats['p99']:8.2f}  "
+                  f"max {stats['max']:8.2f}")
+    memory = results["memory"]
+    if memory["growth_mb_per_min"] is not None:
+        print(f"memory          {memory['samples'][-1]['rss_mb']:10.1f} MB, {memory['growth_mb_per_min']:+.2f} MB/min")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
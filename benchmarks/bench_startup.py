@@ -0,0 +1,146 @@
+"""Measure cold start-up: time to the first stored sample and to the first painted window.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --targets service --json startup.json
+
+Every run starts a fresh interpreter, so module imports are paid in full each
+time. A local stub board answers ``/getSensorData``, and the history database
+lives in a temporary directory. Targets:
+
+    service    headless SensorService: process start to first ingested reading
+    dashboard  SensorInterface: process start to the main window being mapped
+               (needs a display) and to the first reading in the table
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PAYLOAD = json.dumps({"ldrValue": 512, "mq2Value": 230, "humidity": 41.5, "temperature": 23.8,
+                      "pitch": 1.2, "roll": -0.4, "yaw": 88.0}).encode()
+
+
+class StubBoard(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+def child_service(host, database_path):
+    from sensor_service import SensorService, parse_hosts
+
+    first = threading.Event()
+    service = SensorService(parse_hosts(host), database_path)
+    service.add_listener(lambda row: first.set())
+    service.start()
+    first.wait(30)
+    return {"first_sample": time.perf_counter()}
+
+
+def child_dashboard(host, database_path):
+    import database
+
+    marks = {}
+
+    class Probe(database.SensorInterface):
+        DATABASE_PATH = database_path
+
+        def parse_devices(self):
+            return database.parse_hosts(host)
+
+        def update_sensor_display(self):
+            marks.setdefault("first_sample", time.perf_counter())
+            super().update_sensor_display()
+
+    original_mainloop = database.tk.Tk.mainloop
+
+    def mainloop(root, n=0):
+        def mapped(event):
+            if event.widget is root:
+                marks.setdefault("first_paint", time.perf_counter())
+
+        def poll():
+            if len(marks) == 2 or time.perf_counter() - started > 30:
+                root.destroy()
+            else:
+                root.after(10, poll)
+
+        started = time.perf_counter()
+        root.bind("<Map>", mapped, add="+")
+        root.after(10, poll)
+        original_mainloop(root, n)
+
+    database.tk.Tk.mainloop = mainloop
+    Probe()
+    return marks
+
+
+def run_child(target, host):
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [sys.executable, os.path.abspath(__file__), "--child", target, "--host", host,
+                   "--db", os.path.join(tmp, "history.db")]
+        started = time.perf_counter()
+        # perf_counter is system-wide on Linux/macOS, so parent and child share a clock
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        marks = json.loads(output.strip().splitlines()[-1])
+    return {name: mark - started for name, mark in marks.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--targets", nargs="+", default=["service", "dashboard"], choices=["service", "dashboard"])
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--host", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        marks = {"service": child_service, "dashboard": child_dashboard}[args.child](args.host, args.db)
+        print(json.dumps(marks))
+        os._exit(0)  # skip waiting on the poller thread
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBoard)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = "127.0.0.1:%d" % server.server_address[1]
+
+    results = {}
+    for target in args.targets:
+        try:
+            runs = [run_child(target, host) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{target}: failed\n{e.stderr.strip()}", file=sys.stderr)
+            continue
+        results[target] = {name: float(np.median([run[name] for run in runs if name in run]))
+                           for name in sorted({name for run in runs for name in run})}
+    server.shutdown()
+
+    print(f"median over {args.runs} runs (seconds from process start)")
+    for target, marks in results.items():
+        for name, seconds in marks.items():
+            print(f"{target:<12}{name:<16}{seconds:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
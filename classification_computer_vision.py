@@ -1,8 +1,11 @@
 import torch
+from torch.utils.data import DataLoader, Dataset
 from torchvision import models, transforms
 from PIL import Image
 import json
+import logging
 import os
+import numpy as np
 
 # === Load class names ===
 with open("class_names.json", "r") as f:
@@ -39,28 +42,112 @@ def predict_image(image_path, model, device):
         _, pred = torch.max(output, 1)
     return class_names[pred.item()]
 
-def calculate(model, device):
-    cats=dogs=0
-    cat_num=dog_num=0
+def list_images(root, extensions=(".jpg", ".jpeg", ".png")):
+    """Return ``[(image_path, label_index)]`` for an ImageFolder-style tree (one sub-folder per class name)."""
+    samples = []
+    for label, name in enumerate(class_names):
+        folder = os.path.join(root, name)
+        if not os.path.isdir(folder):
+            continue
+        for fname in sorted(os.listdir(folder)):
+            if fname.lower().endswith(extensions):
+                samples.append((os.path.join(folder, fname), label))
+    return samples
+
+# === Batched prediction ===
+class ImageFileDataset(Dataset):
+    """Decodes and transforms image files inside DataLoader workers.
+
+    Files that cannot be read yield a zero tensor with ``ok=False`` instead of
+    failing the whole batch.
+    """
+
+    def __init__(self, image_paths, transform=transform):
+        self.image_paths = list(image_paths)
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, idx):
+        try:
+            with Image.open(self.image_paths[idx]) as image:
+                return self.transform(image.convert('RGB')), idx, True
+        except OSError as e:
+            logging.warning(f"Could not read {self.image_paths[idx]}: {e}")
+            return torch.zeros(3, 224, 224), idx, False
+
+
+def default_workers():
+    return min(4, os.cpu_count() or 1)
+
+
+def image_batches(image_paths, device, batch_size=64, num_workers=None, cache=None):
+    """``(images, indices, ok)`` batches from a TensorCache if given, else from DataLoader workers."""
+    if cache is not None:
+        return cache.batches(image_paths, batch_size)
+    num_workers = default_workers() if num_workers is None else num_workers
+    return DataLoader(ImageFileDataset(image_paths), batch_size=batch_size, shuffle=False,
+                      num_workers=num_workers, pin_memory=device.type == "cuda")
+
+
+def predict_images(image_paths, model, device, batch_size=64, num_workers=None, cache=None):
+    """Classify many images; returns ``[(class_name, confidence), ...]`` in input order
+    (``(None, 0.0)`` for files that could not be read).
+
+    Images are decoded and transformed by ``num_workers`` DataLoader worker
+    processes while the model runs forward passes ``batch_size`` images at a time.
+    With a ``classifier_cache.TensorCache`` only new or changed files are
+    decoded; everything else is read from the cache.
+    """
+    image_paths = list(image_paths)
+    results = [(None, 0.0)] * len(image_paths)
+
+    with torch.inference_mode():
+        for images, indices, ok in image_batches(image_paths, device, batch_size, num_workers, cache):
+            probabilities = torch.softmax(model(images.to(device, non_blocking=True)), dim=1)
+            confidences, preds = probabilities.max(1)
+            for idx, good, pred, confidence in zip(indices.tolist(), ok.tolist(), preds.tolist(), confidences.tolist()):
+                if good:
+                    results[idx] = (class_names[pred], confidence)
+    return results
+
+
+# === Embeddings ===
+def feature_extractor(model):
+    """The model without its ``fc`` layer: images in, 512-d penultimate-layer features out."""
+    return torch.nn.Sequential(*list(model.children())[:-1], torch.nn.Flatten(1)).eval()
+
+
+def embed_images(image_paths, model, device, batch_size=64, num_workers=None, cache=None):
+    """Return ``(features, ok)``: a float32 ``(n, 512)`` array of penultimate-layer features in input
+    order (zeros for files that could not be read) and a boolean array marking the readable ones."""
+    image_paths = list(image_paths)
+    backbone = feature_extractor(model)
+    features = np.zeros((len(image_paths), model.fc.in_features), dtype=np.float32)
+    readable = np.zeros(len(image_paths), dtype=bool)
+
+    with torch.inference_mode():
+        for images, indices, ok in image_batches(image_paths, device, batch_size, num_workers, cache):
+            if not ok.any():
+                continue
+            rows = indices[ok].numpy()
+            features[rows] = backbone(images[ok].to(device, non_blocking=True)).float().cpu().numpy()
+            readable[rows] = True
+    return features, readable
+
+
+def calculate(model, device, batch_size=64, num_workers=None, cache=None):
     cat_folder="./test/cats"
     dog_folder="./test/dogs"
-    for fname in os.listdir(cat_folder):
-        if fname.endswith(".jpg"):
-            cat_num+=1
-            image_path = os.path.join(cat_folder, fname)
-            if os.path.exists(image_path):
-                animal=predict_image(image_path, model, device)
-                if animal=='cats':
-                    cats+=1
-
-    for fname in os.listdir(dog_folder):
-        if fname.lower().endswith(".jpg"):
-            dog_num+=1
-            image_path = os.path.join(dog_folder, fname)
-            if os.path.exists(image_path):
-                animal=predict_image(image_path, model, device)
-                if animal=='dogs':
-                    dogs+=1
+    cat_paths = [os.path.join(cat_folder, fname) for fname in os.listdir(cat_folder) if fname.endswith(".jpg")]
+    dog_paths = [os.path.join(dog_folder, fname) for fname in os.listdir(dog_folder) if fname.lower().endswith(".jpg")]
+    cat_num, dog_num = len(cat_paths), len(dog_paths)
+
+    # One pass over both folders so the batches stay full
+    predictions = predict_images(cat_paths + dog_paths, model, device, batch_size, num_workers, cache)
+    cats = sum(animal == 'cats' for animal, _ in predictions[:cat_num])
+    dogs = sum(animal == 'dogs' for animal, _ in predictions[cat_num:])
     print(f"No. of dogs predicted out of {dog_num} dogs is {dogs}")
     print(f"No. of cats predicted out of {cat_num} cats is {cats}")   
 
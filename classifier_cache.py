@@ -0,0 +1,230 @@
+"""On-disk cache of decoded and resized images for repeated classifier runs.
+
+    python classifier_cache.py ./test            # fill / refresh the cache for a folder tree
+
+Decoding a JPEG and resizing it to 224x224 dominates CPU inference time, and
+it gives the same bytes every run. The cache keeps those bytes as uint8 RGB
+in one memory-mapped array (150 KB per image); ``load()`` returns batches as
+normalized float tensors built straight from the mapped pages.
+
+Entries are keyed by file path and validated against the file's mtime and
+size, so edited or replaced images are decoded again. Every transform
+setting (size, mean, std) is hashed into the cache directory name, so
+changing the transform starts a fresh cache instead of serving stale
+tensors. One process should fill a cache at a time; any number can read it.
+
+``SlotStore`` is the file-keyed memory-mapped store underneath; the
+embedding store in ``classifier_embeddings`` is built on it too.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_ROOT = ".tensor_cache"
+MEAN = (0.485, 0.456, 0.406)  # must match classification_computer_vision.transform
+STD = (0.229, 0.224, 0.225)
+FORMAT_VERSION = 1
+
+
+class SlotStore:
+    """One fixed-shape row per source file in a growing memory-mapped array, plus a JSON index of
+    path -> (slot, mtime, size).
+
+    The directory is ``root`` plus a hash of ``config``, so changing anything
+    that affects the rows starts a fresh store. ``ensure()`` produces rows only
+    for files that are new or whose mtime or size changed; a changed file keeps
+    its slot, and ``prune()`` frees the slots of files that were deleted so
+    new files reuse them. Subclasses only say what a row looks like and implement
+    ``_produce(paths)``, which yields one row (or ``None`` if the file cannot
+    be read) per path.
+    """
+
+    def __init__(self, root, config, row_shape, dtype, data_file, min_growth=1024):
+        self.config = config
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.min_growth = min_growth
+        key = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+        self.directory = os.path.join(root, key)
+        os.makedirs(self.directory, exist_ok=True)
+        self._index_path = os.path.join(self.directory, "index.json")
+        self._data_path = os.path.join(self.directory, data_file)
+        self._row_bytes = int(np.prod(self.row_shape)) * self.dtype.itemsize
+        self.index = {}  # abspath -> [slot, mtime_ns, size]
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self.index = json.load(f)["entries"]
+        self._data = None
+        self._capacity = 0
+        self._map()
+
+    def __len__(self):
+        return len(self.index)
+
+    def _map(self, capacity=None):
+        """(Re)open the memory map, growing the backing file to hold ``capacity`` rows."""
+        current = os.path.getsize(self._data_path) // self._row_bytes if os.path.exists(self._data_path) else 0
+        capacity = max(current, capacity or 0)
+        if capacity > current:
+            with open(self._data_path, "ab") as f:
+                f.truncate(capacity * self._row_bytes)
+        self._capacity = capacity
+        self._data = None if capacity == 0 else np.memmap(
+            self._data_path, dtype=self.dtype, mode="r+", shape=(capacity,) + self.row_shape)
+
+    def _save_index(self):
+        temporary = self._index_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({"config": self.config, "entries": self.index}, f)
+        os.replace(temporary, self._index_path)
+
+    def _slot_count(self):
+        return max((entry[0] for entry in self.index.values()), default=-1) + 1
+
+    def _produce(self, paths):
+        raise NotImplementedError
+
+    def prune(self):
+        """Forget files that no longer exist; their rows are zeroed and their slots reused. Returns how many."""
+        gone = [path for path in self.index if not os.path.exists(path)]
+        if not gone:
+            return 0
+        for path in gone:
+            self._data[self.index.pop(path)[0]] = 0
+        self._data.flush()
+        self._save_index()
+        logging.info(f"Dropped {len(gone)} deleted files from {self.directory}")
+        return len(gone)
+
+    def ensure(self, paths, chunk_size=4096):
+        """Make sure every file in ``paths`` has a current row; returns their slots (-1 if unreadable).
+
+        Rows are produced and saved ``chunk_size`` files at a time, so an
+        interrupted run keeps what it finished.
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        slots = np.full(len(paths), -1, dtype=np.int64)
+        missing = []
+        for i, path in enumerate(paths):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = self.index.get(path)
+            if entry is not None and entry[1] == stat.st_mtime_ns and entry[2] == stat.st_size:
+                slots[i] = entry[0]
+            else:
+                missing.append((i, path, stat, entry[0] if entry else None))
+        if not missing:
+            return slots
+        logging.info(f"{len(paths) - len(missing)} of {len(paths)} files already in {self.directory}, "
+                     f"{len(missing)} to go")
+
+        next_slot = self._slot_count()
+        # Slots freed by prune(), smallest last so pop() hands them out in order
+        free = sorted(set(range(next_slot)) - {entry[0] for entry in self.index.values()}, reverse=True)
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            needed = next_slot + max(0, sum(1 for *_, slot in chunk if slot is None) - len(free))
+            if needed > self._capacity:
+                self._map(max(needed, self._capacity * 2, self.min_growth))
+            for (i, path, stat, slot), row in zip(chunk, self._produce([path for _, path, _, _ in chunk])):
+                if row is None:
+                    continue
+                if slot is None and free:
+                    slot = free.pop()
+                elif slot is None:
+                    slot, next_slot = next_slot, next_slot + 1
+                self._data[slot] = row
+                self.index[path] = [slot, stat.st_mtime_ns, stat.st_size]
+                slots[i] = slot
+            self._data.flush()
+            self._save_index()
+        return slots
+
+    def rows(self):
+        """Every stored row as an ``(n, *row_shape)`` memmap view, row = slot."""
+        count = self._slot_count()
+        if count == 0:
+            return np.zeros((0,) + self.row_shape, dtype=self.dtype)
+        return self._data[:count]
+
+    def paths(self):
+        """Path of every slot (``None`` for a slot no file currently owns)."""
+        by_slot = [None] * self._slot_count()
+        for path, (slot, _, _) in self.index.items():
+            by_slot[slot] = path
+        return by_slot
+
+
+class TensorCache(SlotStore):
+    """Memory-mapped uint8 copies of resized images, plus a JSON index of path -> (slot, mtime, size)."""
+
+    def __init__(self, root=DEFAULT_ROOT, size=(224, 224), mean=MEAN, std=STD, workers=None):
+        import torch
+
+        self.size = tuple(size)
+        self.mean = torch.tensor(mean).view(1, 3, 1, 1)
+        self.std = torch.tensor(std).view(1, 3, 1, 1)
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        config = {"size": self.size, "mean": list(mean), "std": list(std), "resize": "PIL bilinear",
+                  "version": FORMAT_VERSION}
+        super().__init__(root, config, (self.size[1], self.size[0], 3), np.uint8, "images.u8")
+
+    def _decode(self, path):
+        try:
+            with Image.open(path) as image:
+                # Same resampling as transforms.Resize on a PIL image, so cached and uncached paths agree exactly
+                return np.asarray(image.convert("RGB").resize(self.size, Image.BILINEAR), dtype=np.uint8)
+        except OSError as e:
+            logging.warning(f"Could not read {path}: {e}")
+            return None
+
+    def _produce(self, paths):
+        with ThreadPoolExecutor(self.workers) as pool:
+            yield from pool.map(self._decode, paths)
+
+    def load(self, slots):
+        """Return the cached images at ``slots`` as a normalized ``(n, 3, H, W)`` float tensor."""
+        import torch
+
+        pixels = torch.from_numpy(np.asarray(self._data[np.asarray(slots)]))  # reads just these images' pages
+        images = pixels.permute(0, 3, 1, 2).float().div_(255)
+        return images.sub_(self.mean).div_(self.std)
+
+    def batches(self, paths, batch_size=64):
+        """Yield ``(images, indices, ok)`` batches like a DataLoader over ``ImageFileDataset``.
+
+        Unreadable files are skipped rather than padded, so ``ok`` is always true.
+        """
+        import torch
+
+        slots = self.ensure(paths)
+        readable = np.flatnonzero(slots >= 0)
+        for start in range(0, len(readable), batch_size):
+            indices = readable[start:start + batch_size]
+            yield self.load(slots[indices]), torch.from_numpy(indices), torch.ones(len(indices), dtype=torch.bool)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Fill the preprocessed image cache for a folder tree.")
+    parser.add_argument("folders", nargs="+")
+    parser.add_argument("--cache", default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    cache = TensorCache(args.cache)
+    paths = [os.path.join(folder, fname) for root in args.folders for folder, _, files in os.walk(root)
+             for fname in files if fname.lower().endswith((".jpg", ".jpeg", ".png"))]
+    slots = cache.ensure(paths)
+    logging.info(f"{(slots >= 0).sum()} of {len(paths)} images cached in {cache.directory}")
+
+
+if __name__ == "__main__":
+    main()
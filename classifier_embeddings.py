@@ -0,0 +1,219 @@
+"""Image embeddings and cosine-similarity search for finding similar and near-duplicate images.
+
+    python classifier_embeddings.py index ./train ./test              # embed new/changed images
+    python classifier_embeddings.py query test/dogs/dog.5.jpg -k 5    # most similar stored images
+    python classifier_embeddings.py duplicates --threshold 0.97 --output duplicates.csv
+
+Each image is reduced to the 512-d penultimate-layer ResNet-18 feature of the
+trained classifier, L2-normalized, and kept in one memory-mapped float32
+array (2 KB per image, so 500k images take 1 GB). Like ``TensorCache`` it is a
+``classifier_cache.SlotStore``: the index records each file's mtime and size,
+so only new or changed files are embedded again. Files that have since been
+deleted are pruned before every search, so results only name existing files.
+Embeddings depend on the weights, so the store directory is keyed by the
+weights file.
+
+``CosineIndex`` does exact top-k search as blocked matrix products
+(NumPy/BLAS, every core) over the mapped array. It keeps a running top-k per
+query and never holds more than one ``queries x block`` score matrix, so
+memory use stays flat however large the store gets.
+"""
+import argparse
+import csv
+import logging
+import os
+
+import numpy as np
+
+from classifier_cache import SlotStore
+
+DEFAULT_ROOT = ".embeddings"
+DIMENSIONS = 512
+FORMAT_VERSION = 1
+EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class CosineIndex:
+    """Exact top-k cosine search over an ``(n, d)`` array of L2-normalized vectors (may be a memmap)."""
+
+    def __init__(self, vectors, score_budget=32 * 2 ** 20):
+        self.vectors = vectors
+        self.score_budget = score_budget  # floats in one block of scores (128 MB)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, k=10, exclude=None):
+        """Return ``(scores, ids)``, each ``(len(queries), k)`` and best first.
+
+        ``queries`` are normalized here. ``exclude`` optionally gives one stored
+        id per query to leave out, e.g. the query's own entry. Rows with fewer
+        than ``k`` candidates are padded with score ``-inf`` and id ``-1``.
+        """
+        queries = normalize(np.atleast_2d(queries))
+        count, total = len(queries), len(self.vectors)
+        k = max(1, k)
+        best_scores = np.full((count, k), -np.inf, dtype=np.float32)
+        best_ids = np.full((count, k), -1, dtype=np.int64)
+        rows = np.arange(count)
+        block = max(k, self.score_budget // max(1, count))
+
+        for start in range(0, total, block):
+            chunk = np.asarray(self.vectors[start:start + block], dtype=np.float32)
+            scores = queries @ chunk.T  # one sgemm per block
+            if exclude is not None:
+                local = np.asarray(exclude) - start
+                inside = (local >= 0) & (local < len(chunk))
+                scores[rows[inside], local[inside]] = -np.inf
+            if scores.shape[1] > k:
+                # Only this block's own top k can make it into the running top k
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores, ids = np.take_along_axis(scores, top, 1), top + start
+            else:
+                ids = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_ids = np.concatenate([best_ids, ids], axis=1)
+            keep = np.argpartition(merged_scores, -k, axis=1)[:, -k:]
+            best_scores = np.take_along_axis(merged_scores, keep, 1)
+            best_ids = np.take_along_axis(merged_ids, keep, 1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_scores, order, 1), np.take_along_axis(best_ids, order, 1)
+
+    def pairs_above(self, threshold, k=10, query_batch=1024):
+        """Yield ``(i, j, score)`` with ``i < j`` once for every pair whose cosine similarity is at least
+        ``threshold`` and where one of the two is among the other's ``k`` closest neighbours.
+
+        Each entry is compared with every other one in batches of ``query_batch``.
+        A pair can turn up from either side (in a tight cluster the lower id's
+        top k may be full before the higher id's are), so both sides are kept
+        and repeats are dropped.
+        """
+        seen = set()
+        for start in range(0, len(self.vectors), query_batch):
+            ids = np.arange(start, min(start + query_batch, len(self.vectors)))
+            scores, neighbours = self.search(self.vectors[start:start + len(ids)], k, exclude=ids)
+            for row, col in zip(*np.nonzero(scores >= threshold)):
+                a, b = int(ids[row]), int(neighbours[row, col])
+                pair = (min(a, b), max(a, b))
+                if pair not in seen:
+                    seen.add(pair)
+                    yield pair[0], pair[1], float(scores[row, col])
+
+
+class EmbeddingStore(SlotStore):
+    """Memory-mapped, L2-normalized embeddings of image files (a ``SlotStore`` keyed by the weights file)."""
+
+    def __init__(self, weights, root=DEFAULT_ROOT, device=None, batch_size=64, num_workers=None, cache=None):
+        self.weights = weights
+        self.device = device
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.cache = cache  # optional classifier_cache.TensorCache to decode through
+        self._model = None
+        stat = os.stat(weights)
+        config = {"weights": os.path.abspath(weights), "weights_mtime_ns": stat.st_mtime_ns,
+                  "weights_size": stat.st_size, "dimensions": DIMENSIONS, "version": FORMAT_VERSION}
+        super().__init__(root, config, (DIMENSIONS,), np.float32, "vectors.f32", min_growth=4096)
+
+    def _embed(self, paths):
+        import torch
+
+        from classification_computer_vision import embed_images, load_model
+
+        if self._model is None:
+            self.device = self.device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self._model = load_model(self.weights, self.device)
+        return embed_images(paths, self._model, self.device, self.batch_size, self.num_workers, self.cache)
+
+    def _produce(self, paths):
+        features, ok = self._embed(paths)
+        features = normalize(features)
+        return (vector if good else None for vector, good in zip(features, ok))
+
+    def vectors(self):
+        """All stored embeddings as an ``(n, 512)`` memmap, row = slot."""
+        return self.rows()
+
+    def search_index(self):
+        return CosineIndex(self.vectors())
+
+    def similar(self, image_paths, k=10):
+        """For each query image, ``[(path, score), ...]`` of the ``k`` most similar stored images."""
+        self.prune()
+        features, ok = self._embed(list(image_paths))
+        scores, ids = self.search_index().search(features, k)
+        names = self.paths()
+        return [[(names[j], float(score)) for score, j in zip(row_scores, row_ids) if j >= 0 and names[j]]
+                if good else []
+                for row_scores, row_ids, good in zip(scores, ids, ok)]
+
+    def duplicates(self, threshold=0.97, k=10):
+        """``[(path_a, path_b, score)]`` for every stored pair at least ``threshold`` similar."""
+        self.prune()
+        names = self.paths()
+        # Freed slots hold zero vectors, which never reach a positive threshold; the check covers threshold <= 0
+        return [(names[i], names[j], score) for i, j, score in self.search_index().pairs_above(threshold, k)
+                if names[i] and names[j]]
+
+
+def find_images(folders):
+    return sorted(os.path.join(folder, fname) for root in folders for folder, _, files in os.walk(root)
+                  for fname in files if fname.lower().endswith(EXTENSIONS))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Embed images and search them by cosine similarity.")
+    parser.add_argument("--weights", default="dog_cat_classification.pth")
+    parser.add_argument("--store", default=DEFAULT_ROOT)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--cache", help="TensorCache directory to decode through")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_parser = commands.add_parser("index", help="embed every image under the given folders")
+    index_parser.add_argument("folders", nargs="+")
+    query_parser = commands.add_parser("query", help="most similar stored images for each query image")
+    query_parser.add_argument("images", nargs="+")
+    query_parser.add_argument("-k", type=int, default=10)
+    duplicates_parser = commands.add_parser("duplicates", help="list near-duplicate pairs in the store")
+    duplicates_parser.add_argument("--threshold", type=float, default=0.97)
+    duplicates_parser.add_argument("-k", type=int, default=10, help="neighbours checked per image")
+    duplicates_parser.add_argument("--output", help="write the pairs to this CSV file")
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache:
+        from classifier_cache import TensorCache
+
+        cache = TensorCache(args.cache)
+    store = EmbeddingStore(args.weights, args.store, batch_size=args.batch_size, cache=cache)
+
+    if args.command == "index":
+        store.prune()  # before ensure(), so new files take over the freed slots
+        slots = store.ensure(find_images(args.folders))
+        logging.info(f"{(slots >= 0).sum()} images embedded; {len(store)} in {store.directory}")
+    elif args.command == "query":
+        for image, matches in zip(args.images, store.similar(args.images, args.k)):
+            print(image)
+            for path, score in matches:
+                print(f"  {score:.4f}  {path}")
+    else:
+        pairs = store.duplicates(args.threshold, args.k)
+        if args.output:
+            with open(args.output, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["image_a", "image_b", "similarity"])
+                writer.writerows(pairs)
+        for a, b, score in pairs:
+            print(f"{score:.4f}  {a}  {b}")
+        logging.info(f"{len(pairs)} pairs at or above {args.threshold}")
+
+
+if __name__ == "__main__":
+    main()
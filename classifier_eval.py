@@ -0,0 +1,184 @@
+"""Parallel, resumable evaluation of the cat/dog classifier on an ImageFolder-style tree.
+
+    python classifier_eval.py ./test --processes 4 --output eval_results.json
+    python classifier_eval.py /data/big_test --checkpoint big_test.progress.jsonl   # rerun to resume
+
+Images are listed per class from class_names.json (one sub-folder per class),
+split into chunks and classified by worker processes that each load the
+model once. Every finished chunk is appended to the checkpoint file, so an
+interrupted run picks up where it stopped. The result is a confusion matrix,
+per-class precision/recall/F1, accuracy and images/sec.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+_worker = {}
+
+
+def _init_worker(weights, threads, cache_root):
+    import torch
+
+    from classification_computer_vision import load_model
+
+    torch.set_num_threads(threads)
+    _worker["device"] = torch.device("cpu")
+    _worker["model"] = load_model(weights, _worker["device"])
+    if cache_root:
+        from classifier_cache import TensorCache
+
+        _worker["cache"] = TensorCache(cache_root)
+
+
+def _classify_chunk(paths, batch_size):
+    from classification_computer_vision import class_names, predict_images
+
+    # Pool workers are daemonic and cannot start DataLoader workers of their own
+    predictions = predict_images(paths, _worker["model"], _worker["device"], batch_size, num_workers=0,
+                                 cache=_worker.get("cache"))
+    return [class_names.index(animal) if animal is not None else -1 for animal, _ in predictions]
+
+
+def load_checkpoint(path, run_key):
+    """Return ``{image_path: predicted_label}`` from a checkpoint (``{}`` if there is none, ``None`` if it
+    belongs to a different root, weights file or class list)."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        try:
+            header = json.loads(f.readline() or "{}")
+        except json.JSONDecodeError:
+            header = {}  # a header cut off by a crash; nothing after it can be trusted
+        if not isinstance(header, dict) or header.get("run") != run_key:
+            logging.info(f"{path} belongs to a different run; starting over")
+            return None
+        for line in f:
+            try:
+                chunk = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a chunk cut off by the interruption; it is simply redone
+            done.update(zip(chunk["paths"], chunk["preds"]))
+    return done
+
+
+def summarize(labels, preds, names, seconds, images_timed):
+    """Confusion matrix (rows: true class, columns: predicted) plus per-class metrics."""
+    count = len(names)
+    labels, preds = np.asarray(labels), np.asarray(preds)
+    valid = preds >= 0
+    confusion = np.bincount(labels[valid] * count + preds[valid], minlength=count * count).reshape(count, count)
+    true_positive = np.diag(confusion).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = true_positive / confusion.sum(axis=0)
+        recall = true_positive / confusion.sum(axis=1)
+        f1 = 2 * precision * recall / (precision + recall)
+    return {
+        "images": int(len(labels)),
+        "unreadable": int((~valid).sum()),
+        "accuracy": float(true_positive.sum() / max(1, valid.sum())),
+        "classes": names,
+        "confusion_matrix": confusion.tolist(),
+        "per_class": {name: {"precision": float(np.nan_to_num(p)), "recall": float(np.nan_to_num(r)),
+                             "f1": float(np.nan_to_num(f)), "support": int(s)}
+                      for name, p, r, f, s in zip(names, precision, recall, f1, confusion.sum(axis=1))},
+        "images_per_sec": images_timed / seconds if seconds else None,
+    }
+
+
+def evaluate(root, weights, checkpoint, processes=None, chunk_size=256, batch_size=64, cache_root=None):
+    from classification_computer_vision import class_names, list_images
+
+    samples = list_images(root)
+    if not samples:
+        raise ValueError(f"No labelled images under {root} (expected sub-folders {class_names})")
+    run_key = {"root": os.path.abspath(root), "weights": os.path.abspath(weights),
+               "weights_mtime": os.path.getmtime(weights), "classes": class_names}
+    done = load_checkpoint(checkpoint, run_key)
+    if done is None:
+        os.remove(checkpoint)
+        done = {}
+    if not os.path.exists(checkpoint):
+        with open(checkpoint, "w") as f:
+            f.write(json.dumps({"run": run_key}) + "\n")
+    else:
+        with open(checkpoint, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")  # terminate a line cut off by the interruption
+
+    todo = [path for path, _ in samples if path not in done]
+    logging.info(f"{len(samples)} images, {len(done)} already done, {len(todo)} to go")
+    if cache_root and todo:
+        # Fill the cache once here; workers then only read it
+        from classifier_cache import TensorCache
+
+        TensorCache(cache_root).ensure(todo)
+
+    processes = processes or max(1, (os.cpu_count() or 1) // 2)
+    threads = max(1, (os.cpu_count() or 1) // processes)
+    started = time.perf_counter()
+    if todo:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(weights, threads, cache_root)) as pool, \
+                open(checkpoint, "a") as f:
+            chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+            futures = {pool.submit(_classify_chunk, chunk, batch_size): chunk for chunk in chunks}
+            for finished, future in enumerate(as_completed(futures), 1):
+                chunk = futures[future]
+                preds = future.result()
+                f.write(json.dumps({"paths": chunk, "preds": preds}) + "\n")
+                f.flush()
+                done.update(zip(chunk, preds))
+                logging.info(f"{finished}/{len(chunks)} chunks")
+    seconds = time.perf_counter() - started
+
+    labels = [label for _, label in samples]
+    preds = [done[path] for path, _ in samples]
+    return summarize(labels, preds, class_names, seconds, len(todo))
+
+
+def print_summary(result):
+    names = result["classes"]
+    width = max(10, *(len(name) + 2 for name in names))
+    print(f"accuracy {result['accuracy']:.4f} over {result['images']} images "
+          f"({result['unreadable']} unreadable)")
+    if result["images_per_sec"]:
+        print(f"{result['images_per_sec']:.1f} images/sec")
+    print("confusion matrix (rows: true, columns: predicted)")
+    print(" " * width + "".join(f"{name:>{width}}" for name in names))
+    for name, row in zip(names, result["confusion_matrix"]):
+        print(f"{name:<{width}}" + "".join(f"{value:>{width}}" for value in row))
+    print(f"{'class':<{width}}{'precision':>10}{'recall':>10}{'f1':>10}{'support':>10}")
+    for name, metrics in result["per_class"].items():
+        print(f"{name:<{width}}{metrics['precision']:>10.4f}{metrics['recall']:>10.4f}"
+              f"{metrics['f1']:>10.4f}{metrics['support']:>10}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Evaluate the classifier on an ImageFolder-style tree.")
+    parser.add_argument("root", help="test folder with one sub-folder per class, e.g. ./test")
+    parser.add_argument("--weights", default="dog_cat_classification.pth")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--chunk-size", type=int, default=256, help="images per checkpointed work unit")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--checkpoint", help="progress file (default: <root>.progress.jsonl)")
+    parser.add_argument("--cache", help="TensorCache directory to decode through")
+    parser.add_argument("--output", default="eval_results.json")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or os.path.normpath(args.root) + ".progress.jsonl"
+    result = evaluate(args.root, args.weights, checkpoint, args.processes, args.chunk_size, args.batch_size,
+                      args.cache)
+    print_summary(result)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
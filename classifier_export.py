@@ -0,0 +1,203 @@
+"""Export the cat/dog classifier to a frozen CPU artifact and check it against the fp32 model.
+
+    python classifier_export.py --output classifier.pt --quantize static --calibrate ./train --check ./test
+    python classifier_export.py --output classifier.onnx --quantize dynamic --check ./test
+
+``.pt`` files are frozen TorchScript; ``.onnx`` files run through onnxruntime.
+``--quantize static`` calibrates int8 convolutions on images from the
+``--calibrate`` folder (the biggest CPU win for ResNet-18); keep that apart
+from the ``--check`` folder, or the accuracy check measures images the
+quantization was tuned on. ``--quantize dynamic`` only quantizes the final
+Linear layer (TorchScript) or every weight (ONNX).
+``load_exported()`` gives back a callable that ``predict_images`` accepts in
+place of the eager model.
+"""
+import argparse
+import logging
+import os
+import time
+
+import torch
+
+from classification_computer_vision import (ImageFileDataset, class_names, default_workers, list_images,
+                                            load_model, predict_images)
+
+CALIBRATION_IMAGES = 256
+
+
+class ChannelsLast(torch.nn.Module):
+    """Converts the input to NHWC inside the graph, so callers keep passing ordinary NCHW batches."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+def calibration_batches(image_paths, batch_size=32):
+    loader = torch.utils.data.DataLoader(ImageFileDataset(image_paths[:CALIBRATION_IMAGES]), batch_size=batch_size,
+                                         num_workers=default_workers())
+    for images, _, ok in loader:
+        yield images[ok]
+
+
+def quantize_static(model, calibration_paths):
+    """Post-training static int8 quantization (FX graph mode) calibrated on ``calibration_paths``."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    if not calibration_paths:
+        raise ValueError("static quantization needs calibration images (pass --calibrate)")
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+    torch.backends.quantized.engine = engine
+    example = torch.zeros(1, 3, 224, 224)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), example_inputs=(example,))
+    with torch.inference_mode():
+        for images in calibration_batches(calibration_paths):
+            prepared(images)
+    return convert_fx(prepared)
+
+
+def export_torchscript(model, path, quantize=None, channels_last=False, calibration_paths=()):
+    model = model.cpu().eval()
+    if quantize == "static":
+        model = quantize_static(model, calibration_paths)
+    elif quantize == "dynamic":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if channels_last:
+        model = ChannelsLast(model.to(memory_format=torch.channels_last)).eval()
+    with torch.inference_mode():
+        scripted = torch.jit.trace(model, torch.zeros(1, 3, 224, 224))
+    frozen = torch.jit.freeze(scripted)
+    if quantize is None:
+        # Folds batch norms into the convolutions and picks MKLDNN kernels where available
+        frozen = torch.jit.optimize_for_inference(frozen)
+    frozen.save(path)
+
+
+def export_onnx(model, path, quantize=None, channels_last=False, calibration_paths=()):
+    if channels_last:
+        logging.info("channels-last is chosen by onnxruntime itself; ignoring --channels-last")
+    model = model.cpu().eval()
+    target = path if quantize is None else path + ".fp32"
+    torch.onnx.export(model, torch.zeros(1, 3, 224, 224), target, input_names=["images"], output_names=["logits"],
+                      dynamic_axes={"images": {0: "batch"}, "logits": {0: "batch"}}, opset_version=17)
+    if quantize is None:
+        return
+    from onnxruntime import quantization
+
+    if quantize == "dynamic":
+        quantization.quantize_dynamic(target, path, weight_type=quantization.QuantType.QInt8)
+    else:
+        class Reader(quantization.CalibrationDataReader):
+            def __init__(self):
+                self.batches = (images.numpy() for images in calibration_batches(list(calibration_paths)))
+
+            def get_next(self):
+                images = next(self.batches, None)
+                return None if images is None else {"images": images}
+
+        quantization.quantize_static(target, path, Reader(), weight_type=quantization.QuantType.QInt8)
+    os.remove(target)
+
+
+EXPORTERS = {".pt": export_torchscript, ".onnx": export_onnx}
+
+
+def export_model(model, path, quantize=None, channels_last=False, calibration_paths=()):
+    """Write ``model`` to ``path`` (format from the extension: ``.pt`` TorchScript or ``.onnx``)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORTERS:
+        raise ValueError(f"Unsupported export format: {extension}")
+    EXPORTERS[extension](model, path, quantize, channels_last, calibration_paths)
+    logging.info(f"Exported {path} ({os.path.getsize(path) / 2 ** 20:.1f} MB)")
+
+
+class OnnxModel:
+    """onnxruntime session behind the same ``model(batch) -> logits`` call as a torch module."""
+
+    def __init__(self, path, threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, images):
+        logits, = self.session.run(None, {"images": images.cpu().numpy()})
+        return torch.from_numpy(logits)
+
+    def eval(self):
+        return self
+
+
+def load_exported(path, device=torch.device("cpu")):
+    """Load an artifact written by ``export_model``; exported models always run on the CPU."""
+    if device.type != "cpu":
+        raise ValueError("exported models are CPU-only")
+    if path.lower().endswith(".onnx"):
+        return OnnxModel(path)
+    return torch.jit.load(path, map_location="cpu").eval()
+
+
+def check_accuracy(reference, candidate, root, batch_size=64, num_workers=None):
+    """Compare an exported model with the fp32 model on an ImageFolder-style tree.
+
+    Returns both accuracies, how often the two agree and images/sec of each.
+    """
+    samples = list_images(root)
+    if not samples:
+        raise ValueError(f"No labelled images under {root} (expected sub-folders {class_names})")
+    paths = [path for path, _ in samples]
+    labels = [label for _, label in samples]
+    device = torch.device("cpu")
+    report = {"images": len(samples)}
+    predictions = {}
+    for name, model in (("fp32", reference), ("exported", candidate)):
+        started = time.perf_counter()
+        predictions[name] = [animal for animal, _ in predict_images(paths, model, device, batch_size, num_workers)]
+        report[f"{name}_images_per_sec"] = len(paths) / (time.perf_counter() - started)
+        report[f"{name}_accuracy"] = sum(animal == class_names[label]
+                                         for animal, label in zip(predictions[name], labels)) / len(labels)
+    report["agreement"] = sum(a == b for a, b in zip(predictions["fp32"], predictions["exported"])) / len(labels)
+    report["speedup"] = report["exported_images_per_sec"] / report["fp32_images_per_sec"]
+    return report
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Export the cat/dog classifier for fast CPU inference.")
+    parser.add_argument("--weights", default="dog_cat_classification.pth")
+    parser.add_argument("--output", default="classifier.pt", help=".pt (TorchScript) or .onnx")
+    parser.add_argument("--quantize", choices=["static", "dynamic"], help="int8 quantization mode")
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--calibrate", metavar="ROOT", help="folder of calibration images for --quantize static, "
+                                                            "e.g. ./train")
+    parser.add_argument("--check", metavar="ROOT", help="compare with the fp32 model on this test folder")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    device = torch.device("cpu")
+    model = load_model(args.weights, device)
+    if args.calibrate and args.check and os.path.samefile(args.calibrate, args.check):
+        logging.warning("Calibrating on the check folder makes the accuracy check optimistic")
+    calibration = [path for path, _ in list_images(args.calibrate)] if args.calibrate else []
+    # Calibrate on an even spread of the folder rather than the first class only
+    calibration = calibration[::max(1, len(calibration) // CALIBRATION_IMAGES)]
+    export_model(model, args.output, args.quantize, args.channels_last, calibration)
+
+    if args.check:
+        report = check_accuracy(load_model(args.weights, device), load_exported(args.output), args.check,
+                                args.batch_size)
+        for key, value in report.items():
+            print(f"{key:<26}{value:.4f}" if isinstance(value, float) else f"{key:<26}{value}")
+        if report["fp32_accuracy"] - report["exported_accuracy"] > args.max_accuracy_drop:
+            raise SystemExit(f"Exported model loses more than {args.max_accuracy_drop:.2%} accuracy")
+
+
+if __name__ == "__main__":
+    main()
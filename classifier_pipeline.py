@@ -0,0 +1,184 @@
+"""Pipelined CPU inference for the cat/dog classifier with a per-stage latency breakdown.
+
+    python classifier_pipeline.py ./test --batch-size 32 --decode-workers 4 --intra-threads 4 --depth 2
+    python classifier_pipeline.py ./test --sweep --json pipeline.json
+
+A thread pool decodes and transforms images while the calling thread runs the
+model, so JPEG decoding overlaps with compute (PIL and torch both release the
+GIL). ``--depth`` is how many batches may be decoded ahead of the model. Each
+stage is timed separately: decode, transform, copy (batch assembly and
+host-to-device copy), forward and postprocess. Comparing the busy time of
+the decode workers with the forward time shows which side to give more cores.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+
+from classification_computer_vision import class_names, list_images, load_model, transform
+
+STAGES = ("decode", "transform", "copy", "forward", "postprocess")
+
+
+def decode_and_transform(path, draft=False):
+    """Return ``(tensor or None, decode_seconds, transform_seconds)`` for one file."""
+    started = time.perf_counter()
+    try:
+        with Image.open(path) as image:
+            if draft:
+                # Let libjpeg decode at a reduced scale that is still at least 224x224
+                image.draft("RGB", (224, 224))
+            image = image.convert("RGB")
+    except OSError:
+        return None, time.perf_counter() - started, 0.0
+    decoded = time.perf_counter()
+    tensor = transform(image)
+    return tensor, decoded - started, time.perf_counter() - decoded
+
+
+def run_pipeline(image_paths, model, device, batch_size=32, decode_workers=4, depth=2, draft=False):
+    """Classify ``image_paths``; returns ``(predictions, report)``.
+
+    ``predictions`` matches ``predict_images``; ``report`` holds images/sec and,
+    per stage, the total seconds plus p50/p95 per image (decode, transform) or
+    per batch (copy, forward, postprocess).
+    """
+    if batch_size < 1 or depth < 1:
+        # With depth 0 nothing would ever be submitted and every prediction would stay None
+        raise ValueError(f"batch_size and depth must be at least 1 (got {batch_size} and {depth})")
+    image_paths = list(image_paths)
+    timings = {stage: [] for stage in STAGES}
+    predictions = [(None, 0.0)] * len(image_paths)
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(decode_workers) as pool, torch.inference_mode():
+        pending = deque()
+        submitted = iter(enumerate(image_paths))
+
+        def refill():
+            # Keep at most `depth` batches worth of images decoding ahead of the model
+            for idx, path in itertools.islice(submitted, max(0, depth * batch_size - len(pending))):
+                pending.append((idx, pool.submit(decode_and_transform, path, draft)))
+
+        refill()
+        while pending:
+            tensors, indices = [], []
+            while pending and len(tensors) < batch_size:
+                idx, future = pending.popleft()
+                tensor, decode_seconds, transform_seconds = future.result()
+                timings["decode"].append(decode_seconds)
+                timings["transform"].append(transform_seconds)
+                if tensor is not None:
+                    tensors.append(tensor)
+                    indices.append(idx)
+            refill()
+            if not tensors:
+                continue
+
+            mark = time.perf_counter()
+            images = torch.stack(tensors).to(device, non_blocking=True)
+            copied = time.perf_counter()
+            logits = model(images)
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            forwarded = time.perf_counter()
+            confidences, preds = torch.softmax(logits, dim=1).max(1)
+            for idx, pred, confidence in zip(indices, preds.tolist(), confidences.tolist()):
+                predictions[idx] = (class_names[pred], confidence)
+            done = time.perf_counter()
+            timings["copy"].append(copied - mark)
+            timings["forward"].append(forwarded - copied)
+            timings["postprocess"].append(done - forwarded)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "images": len(image_paths),
+        "seconds": elapsed,
+        "images_per_sec": len(image_paths) / elapsed if elapsed else 0.0,
+        "settings": {"batch_size": batch_size, "decode_workers": decode_workers, "depth": depth, "draft": draft,
+                     "intra_threads": torch.get_num_threads(), "inter_threads": torch.get_num_interop_threads()},
+        "stages": {},
+    }
+    for stage, values in timings.items():
+        values = np.asarray(values) * 1000
+        report["stages"][stage] = {
+            "total_s": float(values.sum() / 1000),
+            "p50_ms": float(np.percentile(values, 50)) if len(values) else 0.0,
+            "p95_ms": float(np.percentile(values, 95)) if len(values) else 0.0,
+        }
+    # Share of the wall clock the decode pool was busy (1.0 = every worker busy all the time)
+    busy = report["stages"]["decode"]["total_s"] + report["stages"]["transform"]["total_s"]
+    report["decode_pool_utilization"] = busy / (elapsed * decode_workers) if elapsed else 0.0
+    return predictions, report
+
+
+def print_report(report):
+    settings = report["settings"]
+    print(f"{report['images']} images in {report['seconds']:.2f}s = {report['images_per_sec']:.1f} images/sec  "
+          f"(batch {settings['batch_size']}, decode workers {settings['decode_workers']}, depth {settings['depth']}, "
+          f"torch threads {settings['intra_threads']}/{settings['inter_threads']})")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<12}total {stats['total_s']:8.2f}s  p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+    print(f"  decode pool utilization {report['decode_pool_utilization']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipelined classifier inference with per-stage timings.")
+    parser.add_argument("root", help="ImageFolder-style tree, e.g. ./test")
+    parser.add_argument("--weights", default="dog_cat_classification.pth")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--decode-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--depth", type=int, default=2, help="batches decoded ahead of the model")
+    parser.add_argument("--intra-threads", type=int, help="torch.set_num_threads")
+    parser.add_argument("--inter-threads", type=int, help="torch.set_num_interop_threads")
+    parser.add_argument("--draft", action="store_true", help="reduced-scale JPEG decoding (approximate)")
+    parser.add_argument("--sweep", action="store_true", help="try every split of the cores between decode and torch")
+    parser.add_argument("--limit", type=int, help="only use the first N images")
+    parser.add_argument("--json", help="write the report(s) to this file")
+    args = parser.parse_args()
+    if min(args.batch_size, args.depth, args.decode_workers) < 1:
+        parser.error("--batch-size, --depth and --decode-workers must be at least 1")
+
+    # Inter-op threads can only be set before torch starts any parallel work
+    if args.inter_threads:
+        torch.set_num_interop_threads(args.inter_threads)
+    if args.intra_threads:
+        torch.set_num_threads(args.intra_threads)
+
+    device = torch.device("cpu")
+    model = load_model(args.weights, device)
+    paths = [path for path, _ in list_images(args.root)][:args.limit]
+    if not paths:
+        raise SystemExit(f"No labelled images under {args.root}")
+
+    if args.sweep:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+        settings = [(workers, threads) for workers in counts for threads in counts if workers + threads <= cores + 1]
+    else:
+        settings = [(args.decode_workers, torch.get_num_threads())]
+
+    reports = []
+    for workers, threads in settings:
+        torch.set_num_threads(threads)
+        _, report = run_pipeline(paths, model, device, args.batch_size, workers, args.depth, args.draft)
+        print_report(report)
+        reports.append(report)
+    if args.sweep:
+        best = max(reports, key=lambda report: report["images_per_sec"])["settings"]
+        print(f"best: decode workers {best['decode_workers']}, torch threads {best['intra_threads']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports if args.sweep else reports[0], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Resident cat/dog classification server with dynamic micro-batching.
+
+    python classifier_server.py --model classifier.pt --port 8600
+    curl --data-binary @test/dogs/dog.5.jpg http://127.0.0.1:8600/classify
+    curl http://127.0.0.1:8600/metrics
+
+The model is loaded and warmed up once. Each HTTP request is decoded and
+transformed on its own handler thread, then queued; a single inference
+thread takes whatever requests are waiting (up to ``--max-batch``, waiting at
+most ``--max-wait-ms`` for more after the first) and runs them as one batch.
+Latency, batch size and throughput counters are served in the Prometheus text
+format on ``/metrics``.
+"""
+import argparse
+import io
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import torch
+from PIL import Image
+
+from classification_computer_vision import class_names, load_model, transform
+from metrics import REGISTRY
+
+DEFAULT_PORT = 8600
+
+REQUEST_SECONDS = REGISTRY.histogram("classifier_request_seconds", "Time from request received to response ready")
+QUEUE_SECONDS = REGISTRY.histogram("classifier_queue_seconds", "Time a request waited for its batch to start")
+FORWARD_SECONDS = REGISTRY.histogram("classifier_forward_seconds", "Time of one batched forward pass")
+BATCH_SIZE = REGISTRY.histogram("classifier_batch_size", "Images per forward pass",
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+IMAGES = REGISTRY.counter("classifier_images_total", "Images classified")
+ERRORS = REGISTRY.counter("classifier_errors_total", "Requests that failed", ["reason"])
+
+
+class MicroBatcher:
+    """Collect single-image requests into batches for one model on a dedicated thread."""
+
+    def __init__(self, model, device, max_batch_size=32, max_wait_ms=5.0):
+        self.model = model
+        self.device = device
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        REGISTRY.gauge("classifier_queue_depth", "Requests waiting for a batch", function=self._queue.qsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        """Queue a transformed ``(3, 224, 224)`` tensor; returns a Future of ``(class_name, confidence)``."""
+        future = Future()
+        self._queue.put((image, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, queued in batch:
+                QUEUE_SECONDS.observe(started - queued)
+            try:
+                with torch.inference_mode():
+                    images = torch.stack([image for image, _, _ in batch]).to(self.device)
+                    probabilities = torch.softmax(self.model(images), dim=1)
+                    confidences, preds = probabilities.max(1)
+            except Exception as e:
+                logging.exception("Batch inference failed")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            FORWARD_SECONDS.observe(time.perf_counter() - started)
+            BATCH_SIZE.observe(len(batch))
+            IMAGES.inc(amount=len(batch))
+            for (_, future, _), pred, confidence in zip(batch, preds.tolist(), confidences.tolist()):
+                future.set_result((class_names[pred], confidence))
+
+
+def make_handler(batcher, timeout=30.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for clients sending many images
+
+        def _send(self, status, body, content_type="application/json"):
+            body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, REGISTRY.render(), "text/plain; version=0.0.4; charset=utf-8")
+            elif self.path == "/health":
+                self._send(200, json.dumps({"status": "ok", "classes": class_names}))
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            started = time.perf_counter()
+            try:
+                # Read the whole body first, even for an unknown path: on a keep-alive connection
+                # anything left unread would be parsed as the next request
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            except ValueError:
+                self.close_connection = True
+                self._send(400, json.dumps({"error": "invalid Content-Length"}))
+                return
+            if self.path != "/classify":
+                self._send(404, json.dumps({"error": "not found"}))
+                return
+            try:
+                with Image.open(io.BytesIO(body)) as image:
+                    tensor = transform(image.convert("RGB"))
+            except OSError as e:
+                ERRORS.inc("bad_image")
+                self._send(400, json.dumps({"error": f"cannot decode image: {e}"}))
+                return
+            try:
+                label, confidence = batcher.submit(tensor).result(timeout)
+            except Exception as e:
+                ERRORS.inc("inference")
+                self._send(500, json.dumps({"error": str(e)}))
+                return
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.observe(elapsed)
+            self._send(200, json.dumps({"label": label, "confidence": confidence, "latency_ms": elapsed * 1000}))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def load_any(path, device):
+    """Load fp32 weights (``.pth``) or an artifact from ``classifier_export`` (``.pt``/``.onnx``)."""
+    if path.lower().endswith(".pth"):
+        return load_model(path, device)
+    from classifier_export import load_exported
+
+    return load_exported(path, device)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Serve the cat/dog classifier over HTTP with micro-batching.")
+    parser.add_argument("--model", default="dog_cat_classification.pth", help=".pth weights, or an exported .pt/.onnx")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    device = torch.device("cuda" if torch.cuda.is_available() and args.model.endswith(".pth") else "cpu")
+    model = load_any(args.model, device)
+    with torch.inference_mode():
+        model(torch.zeros(args.max_batch, 3, 224, 224).to(device))  # warm-up: allocations and kernel selection
+
+    batcher = MicroBatcher(model, device, args.max_batch, args.max_wait_ms)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher))
+    server.daemon_threads = True
+    logging.info("Classifying on http://%s:%s/classify", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Train the cat/dog classifier: a new ``fc`` head on a frozen, ImageNet-pretrained ResNet-18.
+
+    python classifier_train.py --train ./train --valid ./test --epochs 10 --cache-features
+    python classifier_train.py --train ./train --valid ./test --workers 8 --json train_report.json
+
+This is the ``train_model`` loop from main.ipynb as a module. Images are
+decoded by ``--workers`` DataLoader processes with pinned memory and
+prefetching. Since only ``fc`` is trained, ``--cache-features`` runs the
+backbone over both folders once, keeps the 512-d embeddings (of each image
+and its mirror image, so the horizontal-flip augmentation survives), and then
+trains the head on those; every epoch after that takes seconds even on a CPU.
+The cache is keyed by the image files and reused by later runs.
+
+Both modes write ``dog_cat_classification.pth`` and ``class_names.json`` in the
+format ``classification_computer_vision.load_model`` reads, and report loss,
+accuracy, images/sec and time spent waiting for data for every epoch.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from torchvision import datasets, models, transforms
+
+DEFAULT_FEATURE_CACHE = ".feature_cache"
+BACKBONE = "resnet18 imagenet pretrained"  # part of the feature cache key
+
+# === Transforms (as in main.ipynb) ===
+train_transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.RandomHorizontalFlip(),
+    transforms.ToTensor(),
+    transforms.Normalize(
+        mean=[0.485, 0.456, 0.406],
+        std=[0.229, 0.224, 0.225]
+    )
+])
+
+valid_transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(
+        mean=[0.485, 0.456, 0.406],
+        std=[0.229, 0.224, 0.225]
+    )
+])
+
+
+def build_model(num_classes, pretrained=True):
+    """ResNet-18 with every layer frozen except a new ``fc`` for ``num_classes``."""
+    model = models.resnet18(pretrained=pretrained)
+    for param in model.parameters():
+        param.requires_grad = False
+    model.fc = nn.Linear(model.fc.in_features, num_classes)
+    return model
+
+
+def set_training(model, training):
+    """Put only the trainable modules in training mode.
+
+    The frozen backbone stays in eval mode, so its batch-norm running statistics
+    are not shifted by the new data and it computes the same features the
+    cached mode uses.
+    """
+    model.eval()
+    if training:
+        for module in model.modules():
+            if any(param.requires_grad for param in module.parameters(recurse=False)):
+                module.train()
+
+
+def make_loader(dataset, batch_size, shuffle, workers, device, prefetch=4):
+    options = {}
+    if workers > 0:
+        # Workers stay alive between epochs and keep `prefetch` batches each ready ahead of the model
+        options = {"persistent_workers": True, "prefetch_factor": prefetch}
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=workers,
+                      pin_memory=device.type == "cuda", **options)
+
+
+def run_epoch(model, batches, criterion, device, optimizer=None):
+    """One pass over ``batches`` of ``(inputs, labels)``; trains when an ``optimizer`` is given.
+
+    Returns loss, accuracy, images/sec and the seconds spent waiting for the
+    next batch (``data_s``) as opposed to computing on it.
+    """
+    training = optimizer is not None
+    set_training(model, training)
+    running_loss, corrects, samples, data_seconds = 0.0, 0, 0, 0.0
+    started = mark = time.perf_counter()
+    with torch.set_grad_enabled(training):
+        for inputs, labels in batches:
+            data_seconds += time.perf_counter() - mark
+            inputs = inputs.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
+            outputs = model(inputs)
+            loss = criterion(outputs, labels)
+            if training:
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+            running_loss += loss.item() * inputs.size(0)
+            corrects += (outputs.argmax(1) == labels).sum().item()
+            samples += inputs.size(0)
+            mark = time.perf_counter()
+    seconds = time.perf_counter() - started
+    return {
+        "loss": running_loss / max(1, samples),
+        "acc": corrects / max(1, samples),
+        "images": samples,
+        "seconds": seconds,
+        "data_s": data_seconds,
+        "images_per_sec": samples / seconds if seconds else 0.0,
+    }
+
+
+def train_model(model, train_batches, valid_batches, criterion, optimizer, device, epochs=10):
+    """The notebook's loop: train, validate, keep the weights with the best validation accuracy.
+
+    Returns ``(model, history)`` with one ``{"epoch", "train", "valid"}`` entry per epoch.
+    """
+    best_acc, best_weights = -1.0, None
+    history = []
+    for epoch in range(epochs):
+        train_stats = run_epoch(model, train_batches, criterion, device, optimizer)
+        valid_stats = run_epoch(model, valid_batches, criterion, device)
+        history.append({"epoch": epoch + 1, "train": train_stats, "valid": valid_stats})
+        logging.info(f"Epoch {epoch + 1}/{epochs}  "
+                     f"train loss {train_stats['loss']:.4f} acc {train_stats['acc']:.4f} "
+                     f"({train_stats['images_per_sec']:.0f} img/s, {train_stats['data_s']:.1f}s waiting for data)  "
+                     f"val loss {valid_stats['loss']:.4f} acc {valid_stats['acc']:.4f} "
+                     f"({valid_stats['images_per_sec']:.0f} img/s)")
+        if valid_stats["acc"] > best_acc:
+            best_acc = valid_stats["acc"]
+            best_weights = copy.deepcopy(model.state_dict())
+    logging.info(f"Best validation accuracy: {best_acc:.4f}")
+    model.load_state_dict(best_weights)
+    return model, history
+
+
+# === Cached backbone features ===
+class FeatureBatches:
+    """Shuffled ``(features, labels)`` batches from cached embeddings, re-drawn every epoch.
+
+    ``features`` is ``(n, views, 512)``; each epoch picks one random view per
+    image, which is what ``RandomHorizontalFlip`` does to the raw images.
+    """
+
+    def __init__(self, features, labels, batch_size, shuffle=True):
+        self.features = features
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+
+    def __iter__(self):
+        count, views = self.features.shape[:2]
+        order = torch.randperm(count) if self.shuffle else torch.arange(count)
+        view = torch.randint(views, (count,)) if self.shuffle else torch.zeros(count, dtype=torch.long)
+        for start in range(0, count, self.batch_size):
+            idx = order[start:start + self.batch_size]
+            yield self.features[idx, view[idx]], self.labels[idx]
+
+
+def feature_key(dataset):
+    """Hash of every image file (path, size, mtime) plus the backbone and transform."""
+    digest = hashlib.sha1(f"{BACKBONE}|{valid_transform}".encode())
+    for path, label in dataset.samples:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}|{label}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def extract_features(backbone, loader, device, flips=True):
+    """Run ``backbone`` over ``loader`` once; returns ``(features (n, views, 512), labels)``."""
+    features, labels = [], []
+    backbone.eval()
+    # no_grad rather than inference_mode: inference tensors could not be fed to the trainable head later
+    with torch.no_grad():
+        for images, targets in loader:
+            images = images.to(device, non_blocking=True)
+            views = [backbone(images)]
+            if flips:
+                views.append(backbone(torch.flip(images, dims=[3])))
+            features.append(torch.stack(views, dim=1).float().cpu())
+            labels.append(targets)
+    return torch.cat(features), torch.cat(labels)
+
+
+def cached_features(dataset, backbone, device, batch_size, workers, flips, cache_root=DEFAULT_FEATURE_CACHE):
+    """Load the embeddings of ``dataset`` from ``cache_root``, computing and storing them on a miss."""
+    os.makedirs(cache_root, exist_ok=True)
+    path = os.path.join(cache_root, f"{feature_key(dataset)}{'-flips' if flips else ''}.pt")
+    if os.path.exists(path):
+        cached = torch.load(path)
+        logging.info(f"Loaded {len(cached['labels'])} cached embeddings from {path}")
+        return cached["features"], cached["labels"]
+    started = time.perf_counter()
+    loader = make_loader(dataset, batch_size, False, workers, device)
+    features, labels = extract_features(backbone, loader, device, flips)
+    seconds = time.perf_counter() - started
+    logging.info(f"Embedded {len(labels)} images in {seconds:.1f}s ({len(labels) / seconds:.0f} img/s)")
+    temporary = path + ".tmp"
+    torch.save({"features": features, "labels": labels}, temporary)
+    os.replace(temporary, path)
+    return features, labels
+
+
+def train(train_dir, valid_dir, epochs=10, batch_size=32, workers=None, lr=0.001, cache_features=False,
+          feature_cache=DEFAULT_FEATURE_CACHE, device=None):
+    """Train on ``train_dir`` and validate on ``valid_dir`` (ImageFolder trees); returns ``(model, classes, history)``."""
+    device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    workers = min(4, os.cpu_count() or 1) if workers is None else workers
+    model = build_model(len(datasets.ImageFolder(train_dir).classes)).to(device)
+    criterion = nn.CrossEntropyLoss()
+
+    if cache_features:
+        train_data = datasets.ImageFolder(train_dir, transform=valid_transform)
+        valid_data = datasets.ImageFolder(valid_dir, transform=valid_transform)
+        head, model.fc = model.fc, nn.Identity()  # the backbone alone outputs the 512-d embedding
+        extract_batch = max(batch_size, 64)
+        train_features, train_labels = cached_features(train_data, model, device, extract_batch, workers, True,
+                                                       feature_cache)
+        valid_features, valid_labels = cached_features(valid_data, model, device, extract_batch, workers, False,
+                                                       feature_cache)
+        optimizer = torch.optim.AdamW(head.parameters(), lr=lr)
+        head, history = train_model(head, FeatureBatches(train_features, train_labels, batch_size),
+                                    FeatureBatches(valid_features, valid_labels, batch_size, shuffle=False),
+                                    criterion, optimizer, device, epochs)
+        model.fc = head
+    else:
+        train_data = datasets.ImageFolder(train_dir, transform=train_transform)
+        valid_data = datasets.ImageFolder(valid_dir, transform=valid_transform)
+        optimizer = torch.optim.AdamW(model.fc.parameters(), lr=lr)
+        model, history = train_model(model, make_loader(train_data, batch_size, True, workers, device),
+                                     make_loader(valid_data, batch_size, False, workers, device),
+                                     criterion, optimizer, device, epochs)
+    return model, train_data.classes, history
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Train the cat/dog classifier head on a frozen ResNet-18.")
+    parser.add_argument("--train", default="./train")
+    parser.add_argument("--valid", default="./test")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, help="DataLoader worker processes (default: up to 4)")
+    parser.add_argument("--cache-features", action="store_true", help="run the backbone once and train on embeddings")
+    parser.add_argument("--feature-cache", default=DEFAULT_FEATURE_CACHE)
+    parser.add_argument("--output", default="dog_cat_classification.pth")
+    parser.add_argument("--class-names", default="class_names.json")
+    parser.add_argument("--json", help="write the per-epoch metrics to this file")
+    args = parser.parse_args()
+
+    model, classes, history = train(args.train, args.valid, args.epochs, args.batch_size, args.workers, args.lr,
+                                    args.cache_features, args.feature_cache)
+    torch.save(model.state_dict(), args.output)
+    with open(args.class_names, "w") as f:
+        json.dump(classes, f)
+    logging.info(f"Saved {args.output} and {args.class_names} ({classes})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(history, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
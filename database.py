@@ -1,23 +1,39 @@
 # Taeam naterida codeG
 import tkinter as tk
 from tkinter import Frame, Label, Button, filedialog, ttk
-import requests
-import pandas as pd
-import time
-from datetime import datetime
 import logging
 import threading
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np  # For mean, median, and standard deviation calculations
-from statsmodels.tsa.arima.model import ARIMA
-import seaborn as sns
+import importlib
+import numpy as np
+from sensor_service import SensorService, SensorClient, parse_hosts, parse_address
+from sensor_schema import COLUMNS, format_column, parse_timestamp, with_datetimes
+from sensor_export import export_in_background
+from sensor_table import VirtualTable
+from sensor_plots import PlotHub, LiveLineChart, LiveBarChart
+from sensor_forecast import ForecastService
+from sensor_forecasters import FORECASTERS
+from metrics import REGISTRY, serve_metrics
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 class SensorInterface:
-    def __init__(self):
+    RETENTION_ROWS = 43200  # 24 hours of history at one sample every 2 seconds
+    DATABASE_PATH = "sensor_history.db"
+    EXPORT_CHUNK_ROWS = 50000
+    FILTER_PAGE_ROWS = 500
+    TABLE_MAX_FPS = 10
+    PLOT_INTERVAL_MS = 500
+    FORECAST_SENSORS = ["GAS VALUE", "HUMIDITY", "TEMPERATURE", "LIGHT INTENSITY"]
+    # Heavy plotting/analytics stacks are imported on first use; these are warmed up in the
+    # background once the window is showing so the first PLOT/FORECAST click stays fast
+    PRELOAD_MODULES = ["matplotlib.pyplot", "matplotlib.backends.backend_tkagg", "seaborn", "statsmodels.tsa.arima.model"]
+    PRELOAD_DELAY_MS = 2000
+    # Prometheus endpoint of this window (a headless sensor_service.py serves its own on 9108)
+    METRICS_ADDRESS = ("127.0.0.1", 9109)
+    METRICS_REFRESH_MS = 1000
+
+    def __init__(self, service_address=None):
         self.root = tk.Tk()
         self.root.title("Sensor Interface")
         self.root.geometry("1000x600")
@@ -35,10 +51,11 @@ class SensorInterface:
         self.ip_frame = Frame(self.main_frame, bg="#87CEEB")
         self.ip_frame.pack(fill="x", padx=10, pady=10)
 
-        Label(self.ip_frame, text="ESP32 IP Address:", bg="#87CEEB").pack(side="left", padx=5)
-        self.ip_entry = tk.Entry(self.ip_frame, width=20)
-        self.ip_entry.insert(0, "192.168.1.80")  # Default IP address
+        Label(self.ip_frame, text="ESP32 IP Addresses:", bg="#87CEEB").pack(side="left", padx=5)
+        self.ip_entry = tk.Entry(self.ip_frame, width=40)
+        self.ip_entry.insert(0, "192.168.1.80")  # Default IP address, separate several boards with commas
         self.ip_entry.pack(side="left", padx=5)
+        self.ip_entry.bind("<Return>", lambda event: self.service.set_devices(self.parse_devices()))
 
         # Top Section (Sensor Data)
         top_frame = Frame(self.main_frame, bg="#87CEEB")
@@ -53,20 +70,8 @@ class SensorInterface:
         sensor_label = Label(sensor_frame, text="LIVE SENSOR VALUES", font=("Arial", 14, "bold"), fg="black", bg="#87CEEB")
         sensor_label.pack(side="top", pady=5)
 
-        # Treeview Table for Sensor Data
-        self.columns = ["LIGHT INTENSITY", "GAS VALUE", "HUMIDITY", "TEMPERATURE", "PITCH", "ROLL", "YAW", "TIMESTAMP"]
-        self.tree = ttk.Treeview(sensor_frame, columns=self.columns, show="headings", height=15)
-        self.tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-
-        # Scrollbar for Table
-        scrollbar = ttk.Scrollbar(sensor_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscroll=scrollbar.set)
-
-        # Define Column Headings
-        for col in self.columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, anchor="center", width=120)
+        # Columns of the sensor table (the table itself is built once the store exists)
+        self.columns = list(COLUMNS)
 
         # Bottom Section (Buttons)
         bottom_frame = Frame(self.main_frame, bg="#87CEEB")
@@ -77,7 +82,7 @@ class SensorInterface:
         style.configure("TButton", width=12, font=("Arial", 10, "bold"), padding=6)
         style.map("TButton", background=[("active", "yellowgreen")])
 
-        buttons = ["SAVE", "DELETE", "DATA ANALYST", "PLOT", "BOOKMARK", "FORECAST", "DATA SORTER"]
+        buttons = ["SAVE", "DELETE", "DATA ANALYST", "PLOT", "BOOKMARK", "FORECAST", "DATA SORTER", "METRICS"]
         self.button_refs = {}
 
         for btn_text in buttons:
@@ -91,49 +96,116 @@ class SensorInterface:
         self.button_refs["PLOT"].config(command=self.plot_menu)
         self.button_refs["FORECAST"].config(command=self.forecast_menu)
         self.button_refs["DATA SORTER"].config(command=self.data_sorter_menu)
-
-        # Create an empty DataFrame to store sensor data
-        self.data = pd.DataFrame(columns=self.columns)
+        self.button_refs["METRICS"].config(command=self.metrics_panel)
+
+        # Ingestion, storage and analytics live in a SensorService: either run here, or in a
+        # separate headless sensor_service.py process that this window mirrors over a socket
+        if service_address:
+            self.ip_entry.config(state="disabled")
+            self.service = SensorService(retention_rows=self.RETENTION_ROWS)
+            self.client = SensorClient(service_address, self.service.ingest_row, on_reset=self.service.clear)
+        else:
+            self.service = SensorService(self.parse_devices(), self.DATABASE_PATH, self.RETENTION_ROWS)
+            self.client = None
+        self.store = self.service.store
+        self.stats = self.service.stats
+        self.index = self.service.index
+        self.database = self.service.database
+        self.service.add_listener(lambda row: self.update_sensor_display())
+
+        # Virtualized Treeview Table for Sensor Data, redrawn from the store at most TABLE_MAX_FPS times a second
+        self.table = VirtualTable(sensor_frame, self.store, self.columns, visible_rows=15, max_refresh_rate=self.TABLE_MAX_FPS)
+        self.table.tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        self.table.scrollbar.pack(side="right", fill="y")
+
+        # One store subscription on the Tk event loop shared by every live plot
+        self.plot_hub = PlotHub(self.root, self.store, interval_ms=self.PLOT_INTERVAL_MS)
+
+        # ARIMA models fitted in a process pool and cached between forecast requests
+        self.forecaster = ForecastService(self.store, self.FORECAST_SENSORS)
+
+        self.metrics_server = None
+        if self.METRICS_ADDRESS:
+            try:
+                self.metrics_server = serve_metrics(*self.METRICS_ADDRESS)
+            except OSError as e:
+                logging.warning(f"Metrics endpoint disabled: {e}")
 
         # Start the data fetching thread
-        self.fetch_data_thread = threading.Thread(target=self.fetch_data_continuously, daemon=True)
-        self.fetch_data_thread.start()
+        self.fetch_data_thread = self.client.start() if self.client else self.service.start()
+
+        if self.PRELOAD_MODULES:
+            self.root.after(self.PRELOAD_DELAY_MS, self.preload_modules)
 
         self.root.mainloop()
+        self.forecaster.shutdown()
+        self.service.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+
+    def preload_modules(self):
+        """Import the heavy analytics and plotting modules on a background thread."""
+        def work():
+            for name in self.PRELOAD_MODULES:
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    logging.warning(f"Could not preload {name}: {e}")
+
+        threading.Thread(target=work, daemon=True).start()
+
+    @property
+    def data(self):
+        """DataFrame view over the retained sensor data."""
+        return self.store.frame()
 
     def save_file(self):
-        """Save the current data to an Excel file."""
+        """Export the recorded history to an Excel, CSV or Parquet file without blocking the UI."""
         file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", 
-                                                    filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")])
-        if file_path:
-            try:
-                with pd.ExcelWriter(file_path, engine="xlsxwriter") as writer:
-                    self.data.to_excel(writer, index=False, sheet_name="Sensor Data")
-                    workbook = writer.book
-                    worksheet = writer.sheets["Sensor Data"]
-                    for i, col in enumerate(self.data.columns):
-                        max_length = max(self.data[col].astype(str).map(len).max(), len(col)) + 2
-                        worksheet.set_column(i, i, max_length)
-                logging.info(f"Data saved successfully to {file_path}")
-            except Exception as e:
-                logging.error(f"Error saving file: {e}")
+                                                    filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"),
+                                                               ("Parquet files", "*.parquet"), ("All files", "*.*")])
+        if not file_path:
+            return
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("Saving Data")
+        Label(progress_window, text=f"Saving to {file_path}").pack(padx=10, pady=5)
+        progress_bar = ttk.Progressbar(progress_window, length=300, maximum=max(len(self.store), 1))
+        progress_bar.pack(padx=10, pady=10)
+
+        def chunks():
+            if self.database is None:
+                # Viewer attached to a remote service: export what this window has retained
+                data = self.data
+                for start in range(0, len(data), self.EXPORT_CHUNK_ROWS):
+                    yield with_datetimes(data.iloc[start:start + self.EXPORT_CHUNK_ROWS])
+                return
+            self.database.flush()
+            # Counted here, on the export thread, so a long history never freezes the window
+            total_rows = self.database.count()
+            self.root.after(0, lambda: progress_bar.configure(maximum=max(total_rows, 1)))
+            for chunk in self.database.iter_range(chunksize=self.EXPORT_CHUNK_ROWS):
+                yield with_datetimes(chunk)
+
+        export_in_background(chunks(), file_path,
+                             progress=lambda rows: self.root.after(0, lambda: progress_bar.configure(value=rows)),
+                             done=lambda rows, error: self.root.after(0, progress_window.destroy))
 
     def delete_data(self):
-        """Delete all entries from the tree view and reset the data DataFrame."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        self.data = pd.DataFrame(columns=self.columns)
+        """Delete all entries from the table and reset the sensor store (on-disk history is kept)."""
+        self.service.clear()
+        self.table.notify()
 
     def data_sorter_menu(self):
         """Open a menu for sorting data based on sensor value range."""
         sorter_window = tk.Toplevel(self.root)
         sorter_window.title("Data Sorter")
-        sorter_window.geometry("400x300")
+        sorter_window.geometry("400x440")
 
         # Select Sensor
         Label(sorter_window, text="Select Sensor:").pack(pady=10)
-        sensor_selection = ttk.Combobox(sorter_window, values=self.columns[:-1])  # Exclude TIMESTAMP
+        sensor_selection = ttk.Combobox(sorter_window, values=self.columns[1:-1])  # Exclude DEVICE and TIMESTAMP
         sensor_selection.pack(pady=10)
 
         # Minimum Value
@@ -146,11 +218,21 @@ class SensorInterface:
         max_value_entry = tk.Entry(sorter_window)
         max_value_entry.pack(pady=5)
 
+        # Optional time range, left blank for no limit
+        Label(sorter_window, text="From (YYYY-MM-DD HH:MM:SS, optional):").pack(pady=5)
+        start_time_entry = tk.Entry(sorter_window)
+        start_time_entry.pack(pady=5)
+
+        Label(sorter_window, text="To (YYYY-MM-DD HH:MM:SS, optional):").pack(pady=5)
+        end_time_entry = tk.Entry(sorter_window)
+        end_time_entry.pack(pady=5)
+
         # Button to Filter Data
-        Button(sorter_window, text="Filter Data", command=lambda: self.filter_data(sensor_selection.get(), min_value_entry.get(), max_value_entry.get())).pack(pady=20)
+        Button(sorter_window, text="Filter Data", command=lambda: self.filter_data(sensor_selection.get(), min_value_entry.get(), max_value_entry.get(),
+                                                                                   start_time_entry.get(), end_time_entry.get())).pack(pady=20)
 
-    def filter_data(self, sensor, min_value, max_value):
-        """Filter data based on the selected sensor and value range."""
+    def filter_data(self, sensor, min_value, max_value, start_time="", end_time=""):
+        """Filter data based on the selected sensor, value range and optional time range."""
         try:
             min_value = float(min_value)
             max_value = float(max_value)
@@ -158,7 +240,14 @@ class SensorInterface:
             logging.error("Invalid input for min or max value.")
             return
 
-        filtered_data = self.data[(self.data[sensor] >= min_value) & (self.data[sensor] <= max_value)]
+        try:
+            start = parse_timestamp(start_time) if start_time.strip() else None
+            end = parse_timestamp(end_time) if end_time.strip() else None
+        except ValueError:
+            logging.error("Invalid time range, expected YYYY-MM-DD HH:MM:SS.")
+            return
+
+        filtered_data = self.index.query(sensor, min_value, max_value, start, end)
 
         if filtered_data.empty:
             logging.info("No data found in the specified range.")
@@ -167,9 +256,9 @@ class SensorInterface:
         self.show_filtered_data(filtered_data)
 
     def show_filtered_data(self, filtered_data):
-        """Display the filtered data in a new window."""
+        """Display the filtered data in a new window, loading further pages as the table is scrolled."""
         filtered_window = tk.Toplevel(self.root)
-        filtered_window.title("Filtered Data")
+        filtered_window.title(f"Filtered Data ({len(filtered_data)} rows)")
         filtered_window.geometry("600x400")
 
         tree = ttk.Treeview(filtered_window, columns=self.columns, show="headings", height=15)
@@ -178,78 +267,99 @@ class SensorInterface:
         # Scrollbar for Filtered Data Table
         scrollbar = ttk.Scrollbar(filtered_window, orient="vertical", command=tree.yview)
         scrollbar.pack(side="right", fill="y")
-        tree.configure(yscroll=scrollbar.set)
 
         # Define Column Headings
         for col in self.columns:
             tree.heading(col, text=col)
             tree.column(col, anchor="center", width=120)
 
-        # Insert filtered data into the Treeview
-        for index, row in filtered_data.iterrows():
-            tree.insert("", "end", values=list(row))
+        pages_loaded = [0]
+
+        def load_next_page():
+            page = filtered_data.page(pages_loaded[0], self.FILTER_PAGE_ROWS)
+            pages_loaded[0] += 1
+            for values in zip(*(format_column(col, page[col].to_numpy()) for col in self.columns)):
+                tree.insert("", "end", values=values)
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            # Materialize the next page once the user scrolls near the end of what is loaded
+            if float(last) > 0.9 and pages_loaded[0] * self.FILTER_PAGE_ROWS < len(filtered_data):
+                load_next_page()
+
+        tree.configure(yscroll=on_scroll)
+        load_next_page()
 
     def data_analyst_menu(self):
         """Open a menu for selecting a sensor for data analysis."""
         data_analyst_window = tk.Toplevel(self.root)
         data_analyst_window.title("Select Sensor for Data Analysis")
-        data_analyst_window.geometry("300x200")
-
-        Button(data_analyst_window, text="TEMPERATURE", width=20, height=2, command=lambda: self.show_data_analysis(data_analyst_window, "TEMPERATURE")).pack(pady=10)
-        Button(data_analyst_window, text="HUMIDITY", width=20, height=2, command=lambda: self.show_data_analysis(data_analyst_window, "HUMIDITY")).pack(pady=10)
-        Button(data_analyst_window, text="LIGHT INTENSITY", width=20, height=2, command=lambda: self.show_data_analysis(data_analyst_window, "LIGHT INTENSITY")).pack(pady=10)
-        Button(data_analyst_window, text="GAS VALUE", width=20, height=2, command=lambda: self.show_data_analysis(data_analyst_window, "GAS VALUE")).pack(pady=10)
-
-    def show_data_analysis(self, parent_window, sensor):
-        """Display statistical analysis for the selected sensor."""
-        sensor_data = self.data[sensor]
-        mean = np.mean(sensor_data)
-        median = np.median(sensor_data)
-        std_dev = np.std(sensor_data)
-
-        analysis_text = f"Mean: {mean:.2f}\nMedian: {median:.2f}\nStandard Deviation: {std_dev:.2f}"
-        
-        analysis_label = Label(parent_window, text=analysis_text, font=("Arial", 12), fg="black", bg="#87CEEB")
+        data_analyst_window.geometry("320x720")
+
+        # Statistics are kept per board, so pick the one to analyse
+        devices = self.stats.devices()
+        device_var = tk.StringVar(value=devices[0] if devices else "")
+        ttk.Combobox(data_analyst_window, textvariable=device_var, values=devices, state="readonly").pack(pady=5)
+
+        analysis_label = Label(data_analyst_window, text="", font=("Arial", 12), fg="black", bg="#87CEEB", justify="left")
+        for sensor in self.columns[1:-1]:  # Exclude DEVICE and TIMESTAMP
+            Button(data_analyst_window, text=sensor, width=20, height=2,
+                   command=lambda sensor=sensor: self.show_data_analysis(analysis_label, sensor,
+                                                                         device_var.get() or None)).pack(pady=5)
         analysis_label.pack(pady=10)
 
-    def fetch_data_continuously(self):
-        """Continuously fetch sensor data from the ESP32."""
-        while True:
-            esp32_url = self.ip_entry.get()
-            sensor_data = self.fetch_sensor_data(f"http://{esp32_url}/getSensorData")
-            if sensor_data:
-                new_row = self.process_sensor_data(sensor_data)
-                self.data.loc[len(self.data)] = new_row
-                self.root.after(0, self.update_sensor_display, new_row)
-            time.sleep(2)
-
-    def fetch_sensor_data(self, url):
-        """Fetch sensor data from the specified URL."""
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logging.error("Error fetching data: %s", e)
-            return None
-
-    def process_sensor_data(self, sensor_data):
-        """Process the raw sensor data and return it in a structured format."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # Adjust timezone if needed
-        return {
-            "LIGHT INTENSITY": sensor_data["ldrValue"],
-            "GAS VALUE": sensor_data["mq2Value"],
-            "HUMIDITY": sensor_data["humidity"],
-            "TEMPERATURE": sensor_data["temperature"],
-            "PITCH": sensor_data["pitch"],
-            "ROLL": sensor_data["roll"],
-            "YAW": sensor_data["yaw"],
-            "TIMESTAMP": timestamp,
-        }
-
-    def update_sensor_display(self, new_row):
-        """Update the tree view with the latest sensor data."""
-        self.tree.insert("", "end", values=list(new_row.values()))
+    def show_data_analysis(self, analysis_label, sensor, device=None):
+        """Display statistical analysis for the selected sensor of one board."""
+        summary = self.stats.summary(sensor, device)
+        quantiles = summary["quantiles"]
+
+        analysis_text = (f"{sensor}{f' on {device}' if device else ''} ({summary['count']} samples)\n"
+                         f"Mean: {summary['mean']:.2f}\nMedian: {quantiles[0.5]:.2f}\n"
+                         f"Standard Deviation: {summary['std']:.2f}\n"
+                         f"P95: {quantiles[0.95]:.2f}\nP99: {quantiles[0.99]:.2f}")
+        for label, (low, high) in summary["windows"].items():
+            analysis_text += f"\nLast {label}: min {low:.2f} / max {high:.2f}"
+
+        analysis_label.config(text=analysis_text)
+
+    def metrics_panel(self):
+        """Show the pipeline metrics (the same numbers served on the metrics endpoint), refreshed every second."""
+        metrics_window = tk.Toplevel(self.root)
+        metrics_window.title("Pipeline Metrics")
+        metrics_window.geometry("800x420")
+
+        columns = ("METRIC", "LABELS", "COUNT / VALUE", "P50 (ms)", "P99 (ms)")
+        tree = ttk.Treeview(metrics_window, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=120)
+        tree.column("METRIC", anchor="w", width=260)
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+
+        def refresh():
+            if not metrics_window.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for metric in REGISTRY.metrics():
+                for labels, value in metric.samples():
+                    label_text = ", ".join(f"{name}={label}" for name, label in zip(metric.labelnames, labels))
+                    if metric.kind == "histogram":
+                        count, _, p50, p99 = metric.summary(value)
+                        row = (metric.name, label_text, count, f"{p50 * 1000:.2f}", f"{p99 * 1000:.2f}")
+                    else:
+                        row = (metric.name, label_text, f"{value:.3g}" if isinstance(value, float) else value, "", "")
+                    tree.insert("", "end", values=row)
+            metrics_window.after(self.METRICS_REFRESH_MS, refresh)
+
+        refresh()
+
+    def parse_devices(self):
+        """Build the list of boards to poll from the comma-separated IP entry."""
+        return parse_hosts(self.ip_entry.get())
+
+    def update_sensor_display(self):
+        """Schedule the table to show the latest sensor data on its next batched refresh."""
+        self.table.notify()
 
     def plot_menu(self):
         """Open a menu to choose plotting options."""
@@ -261,55 +371,35 @@ class SensorInterface:
         Button(plot_window, text="Live Bar Chart", width=20, height=2, command=lambda: self.live_bar_chart(plot_window)).pack(pady=10)
         Button(plot_window, text="Sensor Heatmap", width=20, height=2, command=lambda: self.generate_heatmap(plot_window)).pack(pady=10)
 
+    def plot_device_picker(self, parent_window, plot):
+        """Add a board selector to a live plot; the store interleaves readings from every device."""
+        devices = self.forecaster.devices()
+        device_var = tk.StringVar(value=devices[0] if devices else "")
+        picker = ttk.Combobox(parent_window, textvariable=device_var, values=devices, state="readonly",
+                              postcommand=lambda: picker.configure(values=self.forecaster.devices()))
+        picker.bind("<<ComboboxSelected>>", lambda event: (plot.set_device(device_var.get() or None),
+                                                           self.plot_hub.refresh(plot)))
+        picker.pack(pady=5)
+        plot.set_device(device_var.get() or None)
+
     def live_graph_plotter(self, parent_window):
         """Create a live graph plotter for sensor data."""
-        fig, ax = plt.subplots(figsize=(8, 6))
-        ax.set_title("Live Graph Plotter")
-        ax.set_xlabel("Time (seconds)")
-        ax.set_ylabel("Sensor Values")
-
-        time_data = []
-        gas_values = []
-        ldr_values = []
-        humidity_values = []
-        temp_values = []
-
-        def update_graph():
-            """Update the graph with new data continuously."""
-            while True:
-                current_time = time.time()
-                time_data.append(current_time)
-                gas_values.append(self.data["GAS VALUE"].iloc[-1])
-                ldr_values.append(self.data["LIGHT INTENSITY"].iloc[-1])
-                humidity_values.append(self.data["HUMIDITY"].iloc[-1])
-                temp_values.append(self.data["TEMPERATURE"].iloc[-1])
-
-                ax.clear()
-                ax.plot(time_data, gas_values, label="Gas Value", color="red")
-                ax.plot(time_data, ldr_values, label="LDR", color="blue")
-                ax.plot(time_data, humidity_values, label="Humidity", color="green")
-                ax.plot(time_data, temp_values, label="Temperature", color="orange")
-
-                ax.set_title("Live Graph Plotter")
-                ax.set_xlabel("Time (seconds)")
-                ax.set_ylabel("Sensor Values")
-                ax.legend(loc="upper left")
-
-                canvas.draw()
-                time.sleep(1)
-
-        canvas = FigureCanvasTkAgg(fig, master=parent_window)
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        plot = LiveLineChart(parent_window, [("GAS VALUE", "Gas Value", "red"),
+                                             ("LIGHT INTENSITY", "LDR", "blue"),
+                                             ("HUMIDITY", "Humidity", "green"),
+                                             ("TEMPERATURE", "Temperature", "orange")])
+        self.plot_device_picker(parent_window, plot)
+        plot.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
         # Button to save the graph as a PDF
-        save_button = Button(parent_window, text="Save Graph as PDF", command=lambda: self.save_graph_as_pdf(fig))
+        save_button = Button(parent_window, text="Save Graph as PDF", command=lambda: self.save_graph_as_pdf(plot.figure))
         save_button.pack(pady=10)
 
         # Close button for the plot window
         close_button = Button(parent_window, text="Close", command=parent_window.destroy)
         close_button.pack(pady=10)
 
-        threading.Thread(target=update_graph, daemon=True).start()
+        self.plot_hub.subscribe(plot)
 
     def save_graph_as_pdf(self, fig):
         """Save the current graph as a PDF file."""
@@ -321,42 +411,22 @@ class SensorInterface:
 
     def live_bar_chart(self, parent_window):
         """Create a live bar chart for sensor data."""
-        fig, ax = plt.subplots(figsize=(8, 6))
-        ax.set_title("Live Bar Chart")
-        ax.set_xlabel("Sensor Type")
-        ax.set_ylabel("Value")
-
-        def update_bar_chart():
-            """Update the bar chart with new data continuously."""
-            while True:
-                ax.clear()
-                if not self.data.empty:
-                    ax.bar(["Gas Value", "LDR", "Humidity", "Temperature"], [
-                        self.data["GAS VALUE"].iloc[-1],
-                        self.data["LIGHT INTENSITY"].iloc[-1],
-                        self.data["HUMIDITY"].iloc[-1],
-                        self.data["TEMPERATURE"].iloc[-1]
-                    ], color=["red", "blue", "green", "orange"])
-
-                ax.set_title("Live Bar Chart")
-                ax.set_xlabel("Sensor Type")
-                ax.set_ylabel("Value")
-
-                canvas.draw()
-                time.sleep(1)
-
-        canvas = FigureCanvasTkAgg(fig, master=parent_window)
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        plot = LiveBarChart(parent_window, [("GAS VALUE", "Gas Value", "red"),
+                                            ("LIGHT INTENSITY", "LDR", "blue"),
+                                            ("HUMIDITY", "Humidity", "green"),
+                                            ("TEMPERATURE", "Temperature", "orange")])
+        self.plot_device_picker(parent_window, plot)
+        plot.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
         # Close button for the plot window
         close_button = Button(parent_window, text="Close", command=parent_window.destroy)
         close_button.pack(pady=10)
 
-        threading.Thread(target=update_bar_chart, daemon=True).start()
+        self.plot_hub.subscribe(plot)
 
     def generate_heatmap(self, parent_window):
         """Generate a heatmap for selected sensor data."""
-        if self.data.empty:
+        if self.store.empty:
             logging.warning("No data available for heatmap.")
             return
 
@@ -371,17 +441,33 @@ class SensorInterface:
         sensor_menu = ttk.Combobox(sensor_selection_window, textvariable=selected_sensor, values=sensors)
         sensor_menu.pack(pady=10)
 
+        # Grid layout: hours of the day against days, or minutes against hours
+        layouts = list(self.service.heatmaps)
+        selected_layout = tk.StringVar(value=layouts[0])
+        ttk.Combobox(sensor_selection_window, textvariable=selected_layout, values=layouts, state="readonly").pack(pady=10)
+
+        # Each board has its own grid
+        devices = self.service.heatmaps[layouts[0]].devices()
+        selected_device = tk.StringVar(value=devices[0] if devices else "")
+        ttk.Combobox(sensor_selection_window, textvariable=selected_device, values=devices, state="readonly").pack(pady=10)
+
         Button(sensor_selection_window, text="Generate Heatmap",
-               command=lambda: self.display_heatmap(selected_sensor.get())).pack(pady=20)
+               command=lambda: self.display_heatmap(selected_sensor.get(), selected_layout.get(),
+                                                    selected_device.get() or None)).pack(pady=20)
 
-    def display_heatmap(self, sensor):
-        """Display a heatmap for the selected sensor and provide save functionality."""
-        if self.data.empty or sensor not in self.data.columns:
+    def display_heatmap(self, sensor, layout=None, device=None):
+        """Display a heatmap for the selected sensor of one board and provide save functionality."""
+        if self.store.empty or sensor not in self.columns:
             logging.warning(f"No data available for {sensor} heatmap.")
             return
 
-        # Create a pivot table for heatmap
-        heatmap_data = self.data.pivot_table(index='TIMESTAMP', values=sensor)
+        # The service keeps each grid up to date as readings arrive, so this only copies the cells
+        grid = self.service.heatmaps[layout or next(iter(self.service.heatmaps))]
+        heatmap_data = grid.means(sensor, device)
+        row_labels, column_labels = grid.labels()
+
+        import matplotlib.pyplot as plt
+        import seaborn as sns
 
         # Create a figure for the heatmap
         plt.figure(figsize=(10, 6))
@@ -389,10 +475,10 @@ class SensorInterface:
         # Define a color palette for heatmap
         cmap = sns.color_palette("RdYlGn_r", as_cmap=True)  # Red for high, Orange for mid, Green for low
 
-        sns.heatmap(heatmap_data, cmap=cmap, cbar=True)
-        plt.title(f"Heatmap for {sensor}")
+        sns.heatmap(heatmap_data, cmap=cmap, cbar=True, xticklabels=column_labels, yticklabels=row_labels)
+        plt.title(f"Heatmap for {sensor}{f' on {device}' if device else ''} (mean per {grid.bucket // 60} min)")
         plt.xlabel("Time")
-        plt.ylabel(sensor)
+        plt.ylabel("Period")
         plt.xticks(rotation=45)
 
         # Save button for the heatmap
@@ -414,7 +500,7 @@ class SensorInterface:
         """Open a menu for setting up forecast options."""
         forecast_window = tk.Toplevel(self.root)
         forecast_window.title("Forecast Settings")
-        forecast_window.geometry("300x200")
+        forecast_window.geometry("300x320")
 
         # Time interval input
         Label(forecast_window, text="Forecast Time Interval (seconds):").pack(pady=10)
@@ -422,16 +508,34 @@ class SensorInterface:
         interval_entry = tk.Entry(forecast_window, textvariable=self.interval_var)
         interval_entry.pack(pady=5)
 
+        # Board to forecast: the store interleaves readings from every device
+        Label(forecast_window, text="Device:").pack(pady=5)
+        devices = self.forecaster.devices()
+        self.forecast_device_var = tk.StringVar(value=devices[0] if devices else "")
+        ttk.Combobox(forecast_window, textvariable=self.forecast_device_var, values=devices,
+                     state="readonly").pack(pady=5)
+
+        # Forecasting model
+        Label(forecast_window, text="Model:").pack(pady=5)
+        self.forecast_method_var = tk.StringVar(value="arima")
+        ttk.Combobox(forecast_window, textvariable=self.forecast_method_var, values=list(FORECASTERS),
+                     state="readonly").pack(pady=5)
+
         # Execute Forecast button
         execute_button = Button(forecast_window, text="EXECUTE FORECAST", command=self.execute_forecast)
         execute_button.pack(pady=20)
 
     def execute_forecast(self):
-        """Execute the forecast based on the given time interval."""
+        """Execute the forecast based on the given time interval without blocking the UI."""
         interval = int(self.interval_var.get())
-        forecasted_values = self.forecast_sensor_values(interval)
+        self.forecaster.forecast_async(interval, lambda forecasts: self.root.after(
+            0, self.plot_forecast, interval, self.forecast_sensor_values(forecasts)),
+            method=self.forecast_method_var.get(), device=self.forecast_device_var.get() or None)
+
+    def plot_forecast(self, interval, forecasted_values):
+        """Plot the forecasted values for each sensor."""
+        import matplotlib.pyplot as plt
 
-        # Plotting the forecasted values
         fig, ax = plt.subplots(figsize=(8, 6))
         ax.set_title("Forecasted Sensor Values")
         ax.set_xlabel("Time (seconds)")
@@ -447,26 +551,15 @@ class SensorInterface:
         ax.legend()
         plt.show()
 
-    def forecast_sensor_values(self, interval):
-        """Forecast sensor values using ARIMA for the last available data."""
-        gas_values = self.forecast_with_arima("GAS VALUE", interval)
-        humidity_values = self.forecast_with_arima("HUMIDITY", interval)
-        temperature_values = self.forecast_with_arima("TEMPERATURE", interval)
-        ldr_values = self.forecast_with_arima("LIGHT INTENSITY", interval)  # Include LDR
-
-        return gas_values, humidity_values, temperature_values, ldr_values  # Return LDR values
-
-    def forecast_with_arima(self, sensor, interval):
-        """Fit an ARIMA model and forecast future values for a given sensor."""
-        series = self.data[sensor].dropna()  # Ensure no NaN values
-        model = ARIMA(series, order=(1, 1, 1))  # Adjust (p, d, q) as necessary
-        model_fit = model.fit()
-
-        # Forecast the next values
-        forecast = model_fit.forecast(steps=interval)
-        
-        return forecast
+    def forecast_sensor_values(self, forecasts):
+        """Order the per-sensor forecasts as gas, humidity, temperature and light intensity."""
+        return tuple(forecasts[sensor] for sensor in self.FORECAST_SENSORS)
 
 # Create the main application
 if __name__ == "__main__":
-    app = SensorInterface()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sensor Interface dashboard.")
+    parser.add_argument("--connect", help="attach to a running sensor_service.py at host[:port] instead of polling directly")
+    args = parser.parse_args()
+    app = SensorInterface(parse_address(args.connect) if args.connect else None)
\ No newline at end of file
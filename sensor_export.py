@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+
+from sensor_schema import to_python
+
+XLSX_MAX_ROWS = 1048576
+
+
+def estimate_column_widths(frame, sample_rows=1000):
+    """Estimate spreadsheet column widths from the first ``sample_rows`` rows only."""
+    sample = frame.head(sample_rows)
+    widths = []
+    for col in sample.columns:
+        longest = sample[col].astype(str).str.len().max() if len(sample) else 0
+        widths.append(max(int(longest), len(col)) + 2)
+    return widths
+
+
+def export_csv(chunks, file_path, progress=None):
+    """Write DataFrame chunks to a CSV file, one chunk in memory at a time."""
+    rows = 0
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+    return rows
+
+
+def export_parquet(chunks, file_path, progress=None, compression="zstd", use_dictionary=True):
+    """Write DataFrame chunks to a Parquet file, one row group per chunk.
+
+    ``use_dictionary`` may be a bool or a list of column names to dictionary-encode
+    (the DEVICE column compresses very well this way).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(file_path, table.schema, compression=compression,
+                                          use_dictionary=use_dictionary)
+            writer.write_table(table)
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_xlsx(chunks, file_path, progress=None, sheet_name="Sensor Data", sample_rows=1000):
+    """Write DataFrame chunks to an Excel file using xlsxwriter's constant-memory mode.
+
+    Rows are flushed to disk as soon as they are written, and sheets roll over
+    to a new one once Excel's row limit is reached.
+    """
+    import xlsxwriter
+
+    rows = 0
+    workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True, "nan_inf_to_errors": True,
+                                               "default_date_format": "yyyy-mm-dd hh:mm:ss"})
+    try:
+        worksheet = None
+        sheet_row = 0
+        sheets = 0
+        widths = None
+        for chunk in chunks:
+            if widths is None:
+                widths = estimate_column_widths(chunk, sample_rows)
+            for values in zip(*(to_python(chunk[name]) for name in chunk.columns)):
+                if worksheet is None or sheet_row == XLSX_MAX_ROWS:
+                    sheets += 1
+                    worksheet = workbook.add_worksheet(sheet_name if sheets == 1 else f"{sheet_name} {sheets}")
+                    for i, width in enumerate(widths):
+                        worksheet.set_column(i, i, width)
+                    worksheet.write_row(0, 0, list(chunk.columns))
+                    sheet_row = 1
+                worksheet.write_row(sheet_row, 0, values)
+                sheet_row += 1
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+    finally:
+        workbook.close()
+    return rows
+
+
+EXPORTERS = {
+    ".csv": export_csv,
+    ".parquet": export_parquet,
+    ".xlsx": export_xlsx,
+}
+
+
+def export_chunks(chunks, file_path, progress=None, **options):
+    """Export DataFrame chunks to ``file_path``, picking the format from its extension."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in EXPORTERS:
+        raise ValueError(f"Unsupported export format: {extension}")
+    return EXPORTERS[extension](chunks, file_path, progress=progress, **options)
+
+
+def export_in_background(chunks, file_path, progress=None, done=None, **options):
+    """Run ``export_chunks`` on a daemon thread.
+
+    ``progress(rows)`` is called after every chunk and ``done(rows, error)`` once
+    the export finishes; both run on the worker thread.
+    """
+    def work():
+        try:
+            rows = export_chunks(chunks, file_path, progress=progress, **options)
+        except Exception as e:
+            logging.error(f"Error exporting to {file_path}: {e}")
+            if done:
+                done(0, e)
+            return
+        logging.info(f"Exported {rows} rows to {file_path}")
+        if done:
+            done(rows, None)
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    return thread
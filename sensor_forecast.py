@@ -0,0 +1,143 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sensor_forecasters import make_forecaster
+from sensor_schema import pick_device
+
+
+def fit_arima(values, order, start_params=None):
+    """Fit an ARIMA model in a worker process, warm-starting from ``start_params`` when given."""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    model = ARIMA(np.asarray(values, dtype=np.float64), order=order)
+    if start_params is not None:
+        return model.fit(start_params=start_params)
+    return model.fit()
+
+
+class ForecastService:
+    """ARIMA forecasts for several sensors, fitted off the Tk thread and cached between requests.
+
+    Fitted models are cached per sensor together with the store position they
+    cover. When only a few readings have arrived since, the cached model is
+    extended with the new observations (its parameters are kept and only the
+    filter state moves forward). Once ``refit_every`` readings have
+    accumulated, or the store was cleared, every stale sensor is refitted in a
+    process pool, warm-started from the previous parameters.
+
+    ``method`` selects a forecaster from ``sensor_forecasters`` instead; those
+    are vectorized across sensors and fast enough to fit in-process on every
+    request that sees new data.
+
+    The store interleaves readings from every board, so each forecast is for
+    one ``device`` (its rows of the ``DEVICE`` column) and models are cached
+    per device. ``device`` may only be left out while a single board reports.
+    """
+
+    def __init__(self, store, sensors, method="arima", order=(1, 1, 1), refit_every=500, max_workers=None):
+        self.store = store
+        self.sensors = list(sensors)
+        self.method = method
+        self.order = order
+        self.refit_every = refit_every
+        self.max_workers = max_workers
+        self._cache = {}  # (device, sensor) -> (generation, upto, results)
+        self._fast_cache = None  # (method, device, sensors, generation, upto, forecaster)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # Never fork: the parent runs Tk, the poller's event loop and the SQLite writer thread
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers or len(self.sensors),
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def devices(self):
+        """The boards with readings in the store, in order of first appearance."""
+        _, columns = self.store.view()
+        return list(dict.fromkeys(columns["DEVICE"].tolist())) if "DEVICE" in columns else []
+
+    def _positions(self, columns, device):
+        """Indices (within the store view) of ``device``'s rows; every row when ``device`` is None."""
+        if device is None:
+            # Raises when readings from several boards are interleaved
+            pick_device(dict.fromkeys(columns["DEVICE"].tolist()) if "DEVICE" in columns else [])
+            return np.arange(len(next(iter(columns.values()))))
+        positions = np.flatnonzero(np.asarray(columns["DEVICE"]) == device)
+        if len(positions) == 0:
+            raise ValueError(f"No readings from device {device!r}")
+        return positions
+
+    def _models(self, sensors, device):
+        first, columns = self.store.view()
+        end = first + len(columns[sensors[0]])
+        generation = self.store.generation
+        positions = self._positions(columns, device)
+        models, refits = {}, {}
+
+        for sensor in sensors:
+            values = np.asarray(columns[sensor], dtype=np.float64)
+            cached = self._cache.get((device, sensor))
+            if cached is not None and cached[0] == generation and first <= cached[1] <= end \
+                    and end - cached[1] < self.refit_every:
+                results = cached[2]
+                new = values[positions[positions >= cached[1] - first]]
+                new = new[~np.isnan(new)]  # dropped exactly like the refit below
+                if len(new):
+                    results = results.extend(new)
+                self._cache[(device, sensor)] = (generation, end, results)
+                models[sensor] = results
+            else:
+                start_params = cached[2].params if cached is not None else None
+                series = values[positions]
+                refits[sensor] = self._pool().submit(fit_arima, series[~np.isnan(series)], self.order, start_params)
+
+        for sensor, future in refits.items():
+            results = future.result()
+            self._cache[(device, sensor)] = (generation, end, results)
+            models[sensor] = results
+        return models
+
+    def _fast_forecaster(self, method, sensors, device):
+        first, columns = self.store.view()
+        key = (method, device, tuple(sensors), self.store.generation, first + len(columns[sensors[0]]))
+        if self._fast_cache is None or self._fast_cache[:5] != key:
+            positions = self._positions(columns, device)
+            values = np.column_stack([np.asarray(columns[sensor], dtype=np.float64)[positions] for sensor in sensors])
+            self._fast_cache = key + (make_forecaster(method).fit(values),)
+        return self._fast_cache[5]
+
+    def forecast(self, steps, sensors=None, method=None, device=None):
+        """Return ``{sensor: array of the next `steps` values}`` for ``device``; blocks while models are
+        (re)fitted."""
+        sensors = list(sensors or self.sensors)
+        method = method or self.method
+        if method != "arima":
+            with self._lock:
+                predictions = self._fast_forecaster(method, sensors, device).forecast(steps)
+            return {sensor: predictions[:, i] for i, sensor in enumerate(sensors)}
+
+        with self._lock:
+            models = self._models(sensors, device)
+        return {sensor: np.asarray(models[sensor].forecast(steps=steps)) for sensor in sensors}
+
+    def forecast_async(self, steps, callback, sensors=None, method=None, device=None):
+        """Run ``forecast`` on a daemon thread and pass the result to ``callback`` (on that thread)."""
+        def work():
+            try:
+                callback(self.forecast(steps, sensors, method, device))
+            except Exception:
+                logging.exception("Error computing forecast")
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,155 @@
+import numpy as np
+
+
+class Forecaster:
+    """Common interface: fit on an ``(observations, sensors)`` array, forecast all sensors at once.
+
+    ``fit`` returns the forecaster itself; ``forecast(steps)`` returns an array
+    of shape ``(steps, sensors)``.
+    """
+
+    name = None
+
+    def fit(self, values):
+        raise NotImplementedError
+
+    def forecast(self, steps):
+        raise NotImplementedError
+
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    # Carry the last valid reading forward over gaps so the recursions stay finite
+    mask = np.isnan(values)
+    if mask.any():
+        index = np.where(~mask, np.arange(len(values))[:, None], 0)
+        np.maximum.accumulate(index, axis=0, out=index)
+        values = values[index, np.arange(values.shape[1])]
+        values[np.isnan(values)] = 0.0
+    return values
+
+
+class HoltForecaster(Forecaster):
+    """Holt's linear-trend exponential smoothing.
+
+    Every (alpha, beta) pair of the search grid is run for every sensor in the
+    same pass over time, and each sensor keeps the pair with the lowest
+    one-step-ahead squared error. Only the last ``window`` observations are used.
+    """
+
+    name = "holt"
+
+    def __init__(self, alphas=(0.1, 0.3, 0.5, 0.7, 0.9), betas=(0.01, 0.05, 0.1, 0.3), window=2000):
+        grid = np.array([(a, b) for a in alphas for b in betas])
+        self.alpha = grid[:, 0][:, None]
+        self.beta = grid[:, 1][:, None]
+        self.window = window
+
+    def fit(self, values):
+        values = _as_matrix(values)[-self.window:]
+        pairs = len(self.alpha)
+        level = np.repeat(values[:1], pairs, axis=0)
+        trend = np.zeros_like(level)
+        if len(values) > 1:
+            trend[:] = values[1] - values[0]
+        errors = np.zeros_like(level)
+        for y in values[1:]:
+            predicted = level + trend
+            errors += (y - predicted) ** 2
+            new_level = self.alpha * y + (1 - self.alpha) * predicted
+            trend = self.beta * (new_level - level) + (1 - self.beta) * trend
+            level = new_level
+        best = errors.argmin(axis=0)
+        sensors = np.arange(values.shape[1])
+        self.level_, self.trend_ = level[best, sensors], trend[best, sensors]
+        self.params_ = np.stack([self.alpha[best, 0], self.beta[best, 0]], axis=1)
+        return self
+
+    def forecast(self, steps):
+        horizon = np.arange(1, steps + 1)[:, None]
+        return self.level_ + horizon * self.trend_
+
+
+class ARForecaster(Forecaster):
+    """AR(p) model with intercept, fitted by least squares for all sensors in one batched solve."""
+
+    name = "ar"
+
+    def __init__(self, p=5, window=5000, ridge=1e-6):
+        self.p = p
+        self.window = window
+        self.ridge = ridge
+
+    def fit(self, values):
+        values = _as_matrix(values)[-self.window:]
+        count, sensors = values.shape
+        p = self.p
+        if count <= p + 1:
+            raise ValueError(f"AR({p}) needs more than {p + 1} observations, got {count}")
+        # lags[t, k, s] = values[t + p - 1 - k, s]; shape (count - p, p + 1, sensors) with the intercept column
+        lags = np.stack([values[p - 1 - k:count - 1 - k] for k in range(p)], axis=1)
+        design = np.concatenate([np.ones((count - p, 1, sensors)), lags], axis=1)
+        target = values[p:]
+        gram = np.einsum("tis,tjs->sij", design, design) + self.ridge * np.eye(p + 1)
+        moment = np.einsum("tis,ts->si", design, target)
+        self.coef_ = np.linalg.solve(gram, moment[..., None])[..., 0]  # (sensors, p + 1)
+        self.history_ = values[-p:][::-1].copy()  # most recent first
+        return self
+
+    def forecast(self, steps):
+        history = self.history_.copy()
+        out = np.empty((steps, history.shape[1]))
+        for step in range(steps):
+            nxt = self.coef_[:, 0] + np.einsum("sk,ks->s", self.coef_[:, 1:], history)
+            out[step] = nxt
+            history = np.vstack([nxt, history[:-1]])
+        return out
+
+
+class SeasonalNaiveForecaster(Forecaster):
+    """Repeat the last full season (``season`` readings) for every sensor."""
+
+    name = "seasonal-naive"
+
+    def __init__(self, season=30):
+        self.season = season
+
+    def fit(self, values):
+        values = _as_matrix(values)
+        self.last_season_ = values[-self.season:]
+        return self
+
+    def forecast(self, steps):
+        season = self.last_season_
+        return season[np.arange(steps) % len(season)]
+
+
+class ArimaForecaster(Forecaster):
+    """statsmodels ARIMA, fitted sensor by sensor; kept for accuracy comparisons and as the slow option."""
+
+    name = "arima"
+
+    def __init__(self, order=(1, 1, 1)):
+        self.order = order
+
+    def fit(self, values):
+        from statsmodels.tsa.arima.model import ARIMA
+
+        values = _as_matrix(values)
+        self.results_ = [ARIMA(values[:, s], order=self.order).fit() for s in range(values.shape[1])]
+        return self
+
+    def forecast(self, steps):
+        return np.stack([np.asarray(results.forecast(steps=steps)) for results in self.results_], axis=1)
+
+
+FORECASTERS = {cls.name: cls for cls in (HoltForecaster, ARForecaster, SeasonalNaiveForecaster, ArimaForecaster)}
+
+
+def make_forecaster(name, **options):
+    """Create a forecaster by name: ``holt``, ``ar``, ``seasonal-naive`` or ``arima``."""
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster: {name}")
+    return FORECASTERS[name](**options)
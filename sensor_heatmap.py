@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from sensor_schema import pick_device
+
+# period: seconds covered by one heatmap row, bucket: seconds per cell, rows: periods kept
+HEATMAP_LAYOUTS = {
+    "time of day x day": dict(period=86400, bucket=900, rows=7, row_format="%a %d %b", column_format="%H:%M"),
+    "minute x hour": dict(period=3600, bucket=60, rows=24, row_format="%d %b %H:00", column_format="%M"),
+}
+
+
+def utc_offset():
+    """Seconds to add to an epoch timestamp to get local wall-clock seconds."""
+    return datetime.now().astimezone().utcoffset().total_seconds()
+
+
+class TimeGrid:
+    """Per-channel means binned into a ``rows x (period / bucket)`` calendar grid, one grid per board.
+
+    Each cell keeps a running sum and count, so ``update()`` touches one cell
+    per channel and ``means()`` costs the size of the grid, not of the history.
+    The last row is the current period; when a reading starts a new period
+    every board's grid scrolls up and the oldest rows fall off. Rows are split
+    by their ``device_column`` so interleaved boards are never averaged together.
+    """
+
+    def __init__(self, channels, period=86400, bucket=900, rows=7, row_format="%a %d %b", column_format="%H:%M",
+                 device_column="DEVICE"):
+        if period % bucket:
+            raise ValueError("period must be a multiple of bucket")
+        self.channels = list(channels)
+        self.period = period
+        self.bucket = bucket
+        self.rows = rows
+        self.columns = period // bucket
+        self.row_format = row_format
+        self.column_format = column_format
+        self.device_column = device_column
+        self._offset = utc_offset()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, now=None):
+        """Forget every reading and anchor the last row on the period containing ``now``."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._grids = {}  # device -> (sums, counts), each (channels, rows, columns)
+            self._last_period = int((now + self._offset) // self.period)
+
+    def _grid(self, device):
+        """``(sums, counts)`` of ``device``, created on first use; must be called with ``_lock`` held."""
+        grid = self._grids.get(device)
+        if grid is None:
+            shape = (len(self.channels), self.rows, self.columns)
+            grid = self._grids[device] = (np.zeros(shape), np.zeros(shape, dtype=np.int64))
+        return grid
+
+    def _scroll(self, period):
+        shift = period - self._last_period
+        for sums, counts in self._grids.values():
+            if shift >= self.rows:
+                sums[:] = 0
+                counts[:] = 0
+            else:
+                sums[:, :-shift] = sums[:, shift:]
+                counts[:, :-shift] = counts[:, shift:]
+                sums[:, -shift:] = 0
+                counts[:, -shift:] = 0
+        self._last_period = period
+
+    def devices(self):
+        """The boards seen so far, in order of first appearance."""
+        with self._lock:
+            return list(self._grids)
+
+    def update(self, row, timestamp):
+        """Add one reading (``{channel: value}``) taken at ``timestamp`` epoch seconds."""
+        local = timestamp + self._offset
+        period = int(local // self.period)
+        column = int(local % self.period) // self.bucket
+        with self._lock:
+            if period > self._last_period:
+                self._scroll(period)
+            line = period - self._last_period + self.rows - 1
+            if line < 0:
+                return
+            sums, counts = self._grid(row.get(self.device_column))
+            for i, ch in enumerate(self.channels):
+                value = float(row[ch])
+                if value == value:  # skip NaN
+                    sums[i, line, column] += value
+                    counts[i, line, column] += 1
+
+    def seed(self, frame, timestamps, now=None):
+        """Rebuild the grids from past readings with one ``bincount`` per board and channel."""
+        self.reset(now)
+        local = np.asarray(timestamps, dtype=np.float64) + self._offset
+        periods = np.floor_divide(local, self.period).astype(np.int64)
+        if self.device_column in frame:
+            boards = np.asarray(frame[self.device_column])
+            groups = [(device, boards == device) for device in dict.fromkeys(boards.tolist())]
+        else:
+            groups = [(None, np.ones(len(local), dtype=bool))]
+        with self._lock:
+            if len(periods) and periods.max() > self._last_period:
+                self._last_period = int(periods.max())
+            lines = periods - self._last_period + self.rows - 1
+            cells = lines * self.columns + (np.mod(local, self.period) // self.bucket).astype(np.int64)
+            inside = lines >= 0
+            size = self.rows * self.columns
+            for device, rows in groups:
+                sums, counts = self._grid(device)
+                for i, ch in enumerate(self.channels):
+                    values = np.asarray(frame[ch], dtype=np.float64)
+                    keep = rows & inside & ~np.isnan(values)
+                    sums[i] = np.bincount(cells[keep], weights=values[keep], minlength=size).reshape(self.rows, -1)
+                    counts[i] = np.bincount(cells[keep], minlength=size).reshape(self.rows, -1)
+
+    def means(self, channel, device=None):
+        """Return one board's ``(rows, columns)`` grid of cell means for a channel; empty cells are NaN.
+
+        ``device`` may be left out while only one board has reported; see ``sensor_schema.pick_device``.
+        """
+        i = self.channels.index(channel)
+        with self._lock:
+            if not self._grids:
+                return np.full((self.rows, self.columns), np.nan)
+            sums, counts = self._grids[pick_device(self._grids, device)]
+            sums, counts = sums[i].copy(), counts[i].copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def labels(self):
+        """Return ``(row_labels, column_labels)`` for the current grid, oldest row first."""
+        first = self._last_period - self.rows + 1
+        rows = [datetime.fromtimestamp((first + i) * self.period - self._offset).strftime(self.row_format)
+                for i in range(self.rows)]
+        columns = [time.strftime(self.column_format, time.gmtime(i * self.bucket)) for i in range(self.columns)]
+        return rows, columns
@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+
+
+class RangeResult:
+    """Rows matched by a range query, materialized into DataFrames one page at a time."""
+
+    def __init__(self, store, rows):
+        self.store = store
+        self.rows = rows  # sequence numbers in ingest order
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return len(self.rows) == 0
+
+    def page(self, number, size=500):
+        """Return page ``number`` (0-based) as a DataFrame; rows evicted from the store since the query are skipped."""
+        import pandas as pd
+
+        wanted = self.rows[number * size:(number + 1) * size]
+        first, columns = self.store.view()
+        retained = len(columns[self.store.columns[0]])
+        positions = wanted[(wanted >= first) & (wanted < first + retained)] - first
+        return pd.DataFrame({col: values[positions] for col, values in columns.items()}, columns=self.store.columns)
+
+
+class SensorIndex:
+    """Sorted per-sensor value index over a ``SensorStore``.
+
+    Each sensor keeps a sorted copy of its values (with their row sequence
+    numbers) built from a snapshot of the store, plus the unsorted tail of rows
+    appended since. A value-range query is two binary searches on the sorted
+    part and a short vectorized scan of the tail; the sorted part is rebuilt
+    lazily once the tail grows past ``rebuild_threshold`` rows.
+
+    Rows are appended in time order, so time-range queries binary-search the
+    TIMESTAMP column directly.
+    """
+
+    def __init__(self, store, rebuild_threshold=4096, time_column="TIMESTAMP"):
+        self.store = store
+        self.rebuild_threshold = rebuild_threshold
+        self.time_column = time_column
+        self._lock = threading.Lock()
+        self._sorted = {}
+
+    def _sorted_values(self, sensor, first, values):
+        generation = self.store.generation
+        entry = self._sorted.get(sensor)
+        end = first + len(values)
+        if (entry is None or entry[0] != generation or entry[1] < first
+                or end - entry[1] > self.rebuild_threshold):
+            order = np.argsort(values, kind="stable")
+            entry = (generation, end, values[order], order + first)
+            self._sorted[sensor] = entry
+        return entry[1], entry[2], entry[3]
+
+    def value_range(self, sensor, min_value, max_value):
+        """Return the rows whose ``sensor`` value lies in ``[min_value, max_value]``."""
+        first, columns = self.store.view()
+        values = columns[sensor]
+        with self._lock:
+            built_upto, sorted_values, sorted_rows = self._sorted_values(sensor, first, values)
+
+        low = np.searchsorted(sorted_values, min_value, side="left")
+        high = np.searchsorted(sorted_values, max_value, side="right")
+        rows = sorted_rows[low:high]
+        rows = rows[rows >= first]
+
+        tail = values[built_upto - first:]
+        tail_rows = np.flatnonzero((tail >= min_value) & (tail <= max_value)) + built_upto
+        return RangeResult(self.store, np.sort(np.concatenate([rows, tail_rows])))
+
+    def time_range(self, start, end):
+        """Return the rows whose timestamp (epoch milliseconds) lies in ``[start, end]``; ``None`` leaves that end open."""
+        first, columns = self.store.view()
+        timestamps = columns[self.time_column]
+        low = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        high = len(timestamps) if end is None else np.searchsorted(timestamps, end, side="right")
+        return RangeResult(self.store, np.arange(first + low, first + high))
+
+    def query(self, sensor, min_value, max_value, start=None, end=None):
+        """Combine a value-range and an optional time-range query."""
+        result = self.value_range(sensor, min_value, max_value)
+        if start is None and end is None:
+            return result
+        in_time = self.time_range(start, end)
+        return RangeResult(self.store, np.intersect1d(result.rows, in_time.rows, assume_unique=True))
+
+    def invalidate(self):
+        """Drop every sorted copy; they are rebuilt on the next query."""
+        with self._lock:
+            self._sorted.clear()
@@ -0,0 +1,202 @@
+import logging
+import time
+
+import numpy as np
+
+from metrics import REGISTRY
+
+UPDATE_SECONDS = REGISTRY.histogram("sensor_plot_update_seconds", "Time to update and redraw one live plot",
+                                    ["plot"])
+
+
+def minmax_decimate(x, y, max_points):
+    """Downsample a series to about ``max_points`` points, keeping each bucket's min and max.
+
+    Unlike plain striding this never hides a spike, which is what matters when
+    hours of readings are squeezed into a few hundred pixels.
+    """
+    count = len(y)
+    if count <= max_points:
+        return x, y
+    buckets = max(1, max_points // 2)
+    size = count // buckets
+    usable = buckets * size
+    shaped = y[count - usable:].reshape(buckets, size)
+    offsets = np.arange(buckets) * size + (count - usable)
+    low = shaped.argmin(axis=1) + offsets
+    high = shaped.argmax(axis=1) + offsets
+    # Always keep the newest reading so the live edge of the chart never lags
+    picks = np.unique(np.concatenate([low, high, [count - 1]]))
+    return x[picks], y[picks]
+
+
+class PlotHub:
+    """Single subscription to the sensor store shared by every open plot.
+
+    The hub polls the store on the Tk event loop and, only when new readings
+    have arrived, takes one snapshot and hands it to each registered plot.
+    """
+
+    def __init__(self, root, store, interval_ms=500):
+        self.root = root
+        self.store = store
+        self.interval_ms = interval_ms
+        self._plots = []
+        self._seen = None
+        self._running = False
+
+    def subscribe(self, plot):
+        self._plots.append(plot)
+        plot.canvas.get_tk_widget().bind("<Destroy>", lambda event: self.unsubscribe(plot), add="+")
+        self.refresh(plot)
+        if not self._running:
+            self._running = True
+            self.root.after(self.interval_ms, self._tick)
+
+    def refresh(self, plot):
+        """Redraw ``plot`` from the current store right away (e.g. after it switched boards)."""
+        plot.update(*self.store.view())
+
+    def unsubscribe(self, plot):
+        if plot in self._plots:
+            self._plots.remove(plot)
+
+    def _tick(self):
+        if not self._plots:
+            self._running = False
+            return
+        seen = (self.store.generation, self.store.appended)
+        if seen != self._seen:
+            self._seen = seen
+            snapshot = self.store.view()
+            for plot in list(self._plots):
+                started = time.perf_counter()
+                try:
+                    plot.update(*snapshot)
+                    UPDATE_SECONDS.observe(time.perf_counter() - started, type(plot).__name__)
+                except Exception:
+                    logging.exception("Error updating plot")
+                    self.unsubscribe(plot)
+        self.root.after(self.interval_ms, self._tick)
+
+
+class BlitPlot:
+    """Matplotlib figure embedded in Tk whose data artists are redrawn by blitting.
+
+    The static parts (axes, ticks, legend) are rendered once into a cached
+    background; each update only restores that background and redraws the
+    animated artists. A full redraw happens only when the axis limits change.
+
+    The store interleaves readings from every board, so a plot shows one
+    ``device`` at a time; with ``device=None`` it follows the first board in
+    the store.
+    """
+
+    def __init__(self, master, figsize=(8, 6), device=None):
+        # matplotlib is only loaded once the first plot window opens
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.artists = []
+        self.device = device
+        self._background = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def redraw(self, full=False):
+        if full or self._background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+
+    def set_device(self, device):
+        """Show ``device``'s readings from the next update on, with the y-axis fitted afresh."""
+        self.device = device
+        self.ax.set_ylim(0, 1)
+        self._background = None
+
+    def device_rows(self, columns):
+        """Positions of the shown board's rows in a store snapshot, oldest first."""
+        boards = columns.get("DEVICE")
+        if boards is None or not len(boards):
+            return np.arange(len(next(iter(columns.values()))))
+        return np.flatnonzero(boards == (boards[0] if self.device is None else self.device))
+
+    def fit_ylim(self, low, high):
+        """Grow the y-axis to cover ``[low, high]``; returns True when the limits changed."""
+        if not np.isfinite(low) or not np.isfinite(high):
+            return False
+        bottom, top = self.ax.get_ylim()
+        if bottom <= low and high <= top:
+            return False
+        margin = max((high - low) * 0.1, 1.0)
+        self.ax.set_ylim(min(bottom, low - margin), max(top, high + margin))
+        return True
+
+
+class LiveLineChart(BlitPlot):
+    """Rolling line chart of the last ``window_rows`` readings, min/max-decimated to ``max_points``."""
+
+    def __init__(self, master, channels, window_rows=1800, max_points=600, title="Live Graph Plotter", device=None):
+        super().__init__(master, device=device)
+        self.channels = channels  # [(column, label, color), ...]
+        self.window_rows = window_rows
+        self.max_points = max_points
+        self.ax.set_title(title)
+        self.ax.set_xlabel("Samples ago")
+        self.ax.set_ylabel("Sensor Values")
+        self.ax.set_xlim(-window_rows, 0)
+        self.ax.set_ylim(0, 1)
+        for _, label, color in channels:
+            line, = self.ax.plot([], [], label=label, color=color, animated=True)
+            self.artists.append(line)
+        self.ax.legend(loc="upper left")
+
+    def update(self, first, columns):
+        full = False
+        rows = self.device_rows(columns)[-self.window_rows:]
+        for line, (column, _, _) in zip(self.artists, self.channels):
+            values = np.asarray(columns[column][rows], dtype=np.float64)
+            x = np.arange(-len(values) + 1, 1)
+            x, values = minmax_decimate(x, values, self.max_points)
+            line.set_data(x, values)
+            if len(values):
+                full |= self.fit_ylim(np.nanmin(values), np.nanmax(values))
+        self.redraw(full)
+
+
+class LiveBarChart(BlitPlot):
+    """Bar chart of the latest value of each channel; bars are created once and resized in place."""
+
+    def __init__(self, master, channels, title="Live Bar Chart", device=None):
+        super().__init__(master, device=device)
+        self.channels = channels
+        self.ax.set_title(title)
+        self.ax.set_xlabel("Sensor Type")
+        self.ax.set_ylabel("Value")
+        self.ax.set_ylim(0, 1)
+        bars = self.ax.bar([label for _, label, _ in channels], [0] * len(channels),
+                           color=[color for _, _, color in channels])
+        for bar in bars:
+            bar.set_animated(True)
+            self.artists.append(bar)
+
+    def update(self, first, columns):
+        full = False
+        rows = self.device_rows(columns)
+        for bar, (column, _, _) in zip(self.artists, self.channels):
+            if len(rows):
+                value = float(columns[column][rows[-1]])
+                bar.set_height(value)
+                full |= self.fit_ylim(min(0.0, value), value)
+        self.redraw(full)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import aiohttp
+
+from metrics import REGISTRY
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_TIMEOUT = 1.5
+MAX_BACKOFF = 30.0
+
+FETCH_SECONDS = REGISTRY.histogram("sensor_fetch_seconds", "Time to fetch /getSensorData from a board")
+POLLS = REGISTRY.counter("sensor_polls_total", "Polls sent to each board", ["device"])
+POLL_ERRORS = REGISTRY.counter("sensor_poll_errors_total", "Failed polls per board", ["device"])
+
+
+def make_device(host, device_id=None, interval=DEFAULT_INTERVAL, timeout=DEFAULT_TIMEOUT):
+    """Describe a board that exposes ``/getSensorData`` (robot.ino, smartbed.ino, hello.ino)."""
+    return {
+        "id": device_id or host,
+        "url": f"http://{host}/getSensorData",
+        "interval": interval,
+        "timeout": timeout,
+    }
+
+
+class SensorPoller:
+    """Poll many ESP32 boards concurrently from a single asyncio event loop.
+
+    Every device gets its own task with its own interval, timeout and jittered
+    exponential backoff, so a slow or dead board only ever delays itself. All
+    requests share one ``aiohttp`` session whose connector keeps connections to
+    each board alive between polls.
+
+    ``on_reading(device_id, payload)`` is called from the poller thread for each
+    successful poll.
+    """
+
+    def __init__(self, devices, on_reading, max_backoff=MAX_BACKOFF, connections_per_device=2):
+        self.on_reading = on_reading
+        self.max_backoff = max_backoff
+        self.connections_per_device = connections_per_device
+        self._devices = {device["id"]: device for device in devices}
+        self._tasks = {}
+        self._loop = None
+        self._session = None
+        self._stopped = None
+        REGISTRY.gauge("sensor_poll_error_ratio", "Share of polls that failed, per board", ["device"],
+                       function=self._error_ratios)
+
+    def _error_ratios(self):
+        return {(device_id,): POLL_ERRORS.value(device_id) / POLLS.value(device_id)
+                for device_id in list(self._devices) if POLLS.value(device_id)}
+
+    async def _fetch(self, device):
+        timeout = aiohttp.ClientTimeout(total=device["timeout"])
+        async with self._session.get(device["url"], timeout=timeout) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _poll_device(self, device):
+        failures = 0
+        while True:
+            POLLS.inc(device["id"])
+            started = time.perf_counter()
+            try:
+                payload = await self._fetch(device)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                POLL_ERRORS.inc(device["id"])
+                failures += 1
+                delay = min(self.max_backoff, device["interval"] * 2 ** failures)
+                delay *= random.uniform(0.5, 1.0)
+                logging.error("Error fetching data from %s (retry in %.1fs): %r", device["id"], delay, e)
+                await asyncio.sleep(delay)
+                continue
+
+            FETCH_SECONDS.observe(time.perf_counter() - started)
+            failures = 0
+            try:
+                self.on_reading(device["id"], payload)
+            except Exception:
+                logging.exception("Error handling reading from %s", device["id"])
+            # Small jitter keeps boards that share an interval from polling in lockstep
+            await asyncio.sleep(device["interval"] * random.uniform(0.95, 1.05))
+
+    def _start_task(self, device):
+        self._tasks[device["id"]] = asyncio.ensure_future(self._poll_device(device))
+
+    async def run(self):
+        """Poll every configured device until ``stop()`` is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.connections_per_device,
+                                         keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            self._session = session
+            for device in self._devices.values():
+                self._start_task(device)
+            await self._stopped.wait()
+            tasks = list(self._tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._tasks.clear()
+
+    def run_forever(self):
+        """Run the poller on a private event loop in the calling thread."""
+        asyncio.run(self.run())
+
+    def start(self):
+        """Run the poller in a daemon thread and return the thread."""
+        thread = threading.Thread(target=self.run_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def set_devices(self, devices):
+        """Replace the polled devices; safe to call from any thread."""
+        devices = {device["id"]: device for device in devices}
+
+        def apply():
+            for device_id in list(self._tasks):
+                if devices.get(device_id) != self._devices.get(device_id):
+                    self._tasks.pop(device_id).cancel()
+            self._devices = devices
+            for device_id, device in devices.items():
+                if device_id not in self._tasks:
+                    self._start_task(device)
+
+        if self._loop is None:
+            self._devices = devices
+        else:
+            self._loop.call_soon_threadsafe(apply)
+
+    def stop(self):
+        """Stop polling; safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Poll ESP32 /getSensorData endpoints and log the readings.")
+    parser.add_argument("hosts", nargs="+", help="board addresses, e.g. 192.168.1.80 or 127.0.0.1:8080")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    args = parser.parse_args()
+
+    poller = SensorPoller([make_device(host, interval=args.interval, timeout=args.timeout) for host in args.hosts],
+                          lambda device_id, payload: logging.info("%s: %s", device_id, payload))
+    try:
+        poller.run_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,98 @@
+"""Column layout and compact dtypes of a sensor reading.
+
+Readings are kept typed end to end: TIMESTAMP is an int64 count of
+milliseconds since the Unix epoch, the raw ADC readings of the LDR and MQ-2
+(``ldrValue``/``mq2Value``, 12-bit on the ESP32) are uint16 and the other
+analog channels are float32. Timestamps are only turned into local
+wall-clock text when they are shown to a person.
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DTYPES = {
+    "DEVICE": np.dtype(object),
+    "LIGHT INTENSITY": np.dtype(np.uint16),
+    "GAS VALUE": np.dtype(np.uint16),
+    "HUMIDITY": np.dtype(np.float32),
+    "TEMPERATURE": np.dtype(np.float32),
+    "PITCH": np.dtype(np.float32),
+    "ROLL": np.dtype(np.float32),
+    "YAW": np.dtype(np.float32),
+    "TIMESTAMP": np.dtype(np.int64),
+}
+COLUMNS = list(DTYPES)
+CHANNELS = COLUMNS[1:-1]
+
+
+def now_ms():
+    """Current time as epoch milliseconds."""
+    return time.time_ns() // 1_000_000
+
+
+def to_seconds(timestamps):
+    """Epoch milliseconds (scalar or array) to float epoch seconds."""
+    return np.asarray(timestamps, dtype=np.float64) / 1000.0
+
+
+def parse_timestamp(value):
+    """Turn a local ``YYYY-MM-DD HH:MM:SS`` string, a datetime or epoch milliseconds into epoch milliseconds."""
+    if isinstance(value, str):
+        value = datetime.strptime(value.strip(), TIMESTAMP_FORMAT)
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+def format_timestamp(ms):
+    """Epoch milliseconds to local ``YYYY-MM-DD HH:MM:SS`` text."""
+    return datetime.fromtimestamp(ms / 1000).strftime(TIMESTAMP_FORMAT)
+
+
+def format_column(name, values):
+    """Return a column's values as display strings (shortest round-trip form for float32)."""
+    values = np.asarray(values)
+    if name == "TIMESTAMP":
+        return [format_timestamp(ms) for ms in values.tolist()]
+    return values.astype(str).tolist()
+
+
+def pick_device(devices, device=None):
+    """Resolve which board's readings to use.
+
+    Readings from several boards are interleaved in one store, and their
+    statistics, charts and forecasts are only meaningful for one board at a
+    time. ``device=None`` is allowed while at most one board has reported.
+    """
+    if device is None:
+        if len(devices) > 1:
+            raise ValueError(f"Readings from several devices are interleaved; pick one of {list(devices)}")
+        return next(iter(devices), None)
+    if device not in devices:
+        raise ValueError(f"No readings from device {device!r}")
+    return device
+
+
+def to_python(values):
+    """Return a column's values as plain Python scalars for JSON or a spreadsheet.
+
+    float32 values become the float of their shortest round-trip form, so a
+    stored 23.1 is written as 23.1 rather than 23.100000381469727.
+    """
+    if values.dtype == np.float32:
+        return np.asarray(values).astype(str).astype(np.float64).tolist()
+    return values.tolist()
+
+
+def with_datetimes(frame):
+    """Return a copy of ``frame`` whose TIMESTAMP column holds local, timezone-naive datetimes (for exports)."""
+    import pandas as pd
+
+    if "TIMESTAMP" not in frame or frame["TIMESTAMP"].dtype.kind != "i":
+        return frame
+    utc = pd.to_datetime(frame["TIMESTAMP"], unit="ms", utc=True)
+    local = utc.dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+    return frame.assign(TIMESTAMP=local)
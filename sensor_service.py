@@ -0,0 +1,360 @@
+"""Headless sensor ingestion service.
+
+Polls the ESP32 boards, keeps the in-memory store, statistics and index up to
+date, persists every reading to SQLite and publishes readings to any number
+of viewers over a local TCP socket (one JSON object per line).
+
+Run it on a gateway without a display:
+
+    python sensor_service.py --hosts 192.168.1.80,192.168.1.81 --port 8765
+
+and attach the Tk dashboard with ``python database.py --connect 127.0.0.1:8765``.
+"""
+import argparse
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from itertools import islice
+from metrics import DEFAULT_PORT as METRICS_PORT, REGISTRY, serve_metrics
+from sensor_heatmap import HEATMAP_LAYOUTS, TimeGrid
+from sensor_index import SensorIndex
+from sensor_poller import SensorPoller, make_device
+from sensor_schema import CHANNELS, COLUMNS, DTYPES, now_ms, to_python, to_seconds
+from sensor_stats import SensorStatistics
+from sensor_storage import DROPPED, SensorDatabase
+from sensor_store import SensorStore
+
+DEFAULT_PORT = 8765
+
+PROCESS_SECONDS = REGISTRY.histogram("sensor_process_seconds", "Time to turn a board payload into a row")
+APPEND_SECONDS = REGISTRY.histogram("sensor_store_append_seconds", "Time to append a row to the in-memory store")
+INGEST_SECONDS = REGISTRY.histogram("sensor_ingest_seconds",
+                                    "Time to store, persist, analyse and hand a row to the listeners")
+
+
+def process_sensor_data(sensor_data, device_id=""):
+    """Process the raw sensor data and return it in a structured format (see ``sensor_schema``)."""
+    timestamp = now_ms()
+    return {
+        "DEVICE": device_id,
+        "LIGHT INTENSITY": sensor_data["ldrValue"],
+        "GAS VALUE": sensor_data["mq2Value"],
+        "HUMIDITY": sensor_data["humidity"],
+        "TEMPERATURE": sensor_data["temperature"],
+        "PITCH": sensor_data["pitch"],
+        "ROLL": sensor_data["roll"],
+        "YAW": sensor_data["yaw"],
+        "TIMESTAMP": timestamp,
+    }
+
+
+def parse_hosts(text):
+    """Build the list of boards to poll from a comma-separated list of addresses."""
+    hosts = [host.strip() for host in text.split(",")]
+    return [make_device(host) for host in hosts if host]
+
+
+class SensorService:
+    """Ingestion, storage and analytics without any UI.
+
+    With ``devices`` the service polls the boards itself; with
+    ``database_path`` it persists readings and recovers the latest
+    ``retention_rows`` on start-up. A viewer attached to a remote service
+    passes neither and feeds rows through ``ingest_row`` instead.
+
+    Listeners registered with ``add_listener(callback)`` are called with each
+    new row on the ingest thread, so they must return quickly.
+    """
+
+    def __init__(self, devices=None, database_path=None, retention_rows=43200):
+        self.columns = list(COLUMNS)
+        self.store = SensorStore(self.columns, capacity=retention_rows, dtypes=DTYPES)
+        self.stats = SensorStatistics(CHANNELS)
+        self.index = SensorIndex(self.store)
+        self.heatmaps = {name: TimeGrid(CHANNELS, **layout) for name, layout in HEATMAP_LAYOUTS.items()}
+        self._listeners = []
+
+        self.database = None
+        if database_path:
+            self.database = SensorDatabase(database_path, self.columns, DTYPES)
+            recovered = self.database.latest(retention_rows)
+            self.store.extend(recovered)
+            timestamps = to_seconds(recovered["TIMESTAMP"])
+            self.stats.seed(recovered, timestamps)
+            for heatmap in self.heatmaps.values():
+                heatmap.seed(recovered, timestamps)
+
+        self.poller = SensorPoller(devices, self.handle_sensor_data) if devices is not None else None
+
+        REGISTRY.gauge("sensor_store_rows", "Readings retained in memory", function=lambda: len(self.store))
+        if self.database is not None:
+            REGISTRY.gauge("sensor_db_queue_depth", "Readings waiting for the SQLite writer",
+                           function=self.database.pending)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self):
+        """Start polling on a background thread (no-op for a service without devices)."""
+        if self.poller is not None:
+            return self.poller.start()
+
+    def set_devices(self, devices):
+        if self.poller is not None:
+            self.poller.set_devices(devices)
+
+    def stop(self):
+        if self.poller is not None:
+            self.poller.stop()
+        if self.database is not None:
+            self.database.close()
+
+    def handle_sensor_data(self, device_id, sensor_data):
+        """Turn a payload delivered by the poller into a row and ingest it."""
+        started = time.perf_counter()
+        try:
+            row = process_sensor_data(sensor_data, device_id)
+        except (KeyError, TypeError):
+            DROPPED.inc("invalid_payload")
+            raise
+        PROCESS_SECONDS.observe(time.perf_counter() - started)
+        self.ingest_row(row)
+
+    def ingest_row(self, row):
+        """Store, persist and analyse one row, then hand it to the listeners."""
+        started = time.perf_counter()
+        self.store.append(row)
+        APPEND_SECONDS.observe(time.perf_counter() - started)
+        if self.database is not None:
+            self.database.append(row)
+        timestamp = row["TIMESTAMP"] / 1000.0
+        self.stats.update(row, timestamp)
+        for heatmap in self.heatmaps.values():
+            heatmap.update(row, timestamp)
+        for listener in list(self._listeners):
+            try:
+                listener(row)
+            except Exception:
+                logging.exception("Error in sensor listener")
+        INGEST_SECONDS.observe(time.perf_counter() - started)
+
+    def clear(self):
+        """Reset the in-memory store, statistics and heatmaps; on-disk history is kept."""
+        self.store.clear()
+        self.stats.reset()
+        for heatmap in self.heatmaps.values():
+            heatmap.reset()
+
+
+class SensorPublisher:
+    """Broadcast rows from a ``SensorService`` to viewers connected over TCP.
+
+    Each client gets its own bounded queue and writer thread, so a stalled
+    viewer only drops its own updates and never slows down ingestion.
+
+    Every row is numbered as it is published and the last ``backlog_rows``
+    are kept. A connecting viewer sends the publisher epoch and the last
+    number it holds; it then receives only the rows after that, or, if it
+    is new, comes from an earlier publisher or has fallen further behind
+    than the backlog reaches, a ``reset`` followed by the whole backlog.
+    """
+
+    def __init__(self, service, host="127.0.0.1", port=DEFAULT_PORT, backlog_rows=43200, client_queue_size=10000,
+                 handshake_timeout=2.0):
+        self.service = service
+        self.backlog_rows = backlog_rows
+        self.client_queue_size = client_queue_size
+        self.handshake_timeout = handshake_timeout
+        self.dropped = 0
+        self.epoch = time.time_ns()  # tells viewers a restarted publisher's numbers apart
+        self._clients = []
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._recent = deque(maxlen=backlog_rows)  # encoded lines of the last rows, oldest first
+        with self._lock:
+            for row in self._retained_rows():
+                self._record(row)
+        self._server = socket.create_server((host, port), reuse_port=False)
+        self.address = self._server.getsockname()
+        service.add_listener(self.publish)
+        REGISTRY.gauge("sensor_viewers", "Connected viewers", function=lambda: len(self._clients))
+        REGISTRY.gauge("sensor_viewer_queue_depth", "Rows waiting in the fullest viewer queue",
+                       function=lambda: max((q.qsize() for q in list(self._clients)), default=0))
+
+    def start(self):
+        thread = threading.Thread(target=self._accept_loop, daemon=True)
+        thread.start()
+        logging.info("Publishing sensor data on %s:%s", *self.address[:2])
+        return thread
+
+    def close(self):
+        self.service.remove_listener(self.publish)
+        self._server.close()
+
+    def _retained_rows(self):
+        """Rows already in the store when the publisher starts (e.g. recovered from SQLite)."""
+        _, columns = self.service.store.view()
+        names = list(columns)
+        values = zip(*(to_python(columns[name][-self.backlog_rows:]) for name in names))
+        return [dict(zip(names, row)) for row in values]
+
+    def _record(self, row):
+        """Number ``row`` and remember it for replay; must be called with ``_lock`` held."""
+        self._seq += 1
+        line = (json.dumps({"seq": self._seq, "row": row}) + "\n").encode()
+        self._recent.append(line)
+        return line
+
+    def publish(self, row):
+        with self._lock:
+            line = self._record(row)
+            clients = list(self._clients)
+        for client_queue in clients:
+            try:
+                client_queue.put_nowait(line)
+            except queue.Full:
+                self.dropped += 1
+                DROPPED.inc("viewer_queue_full")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, address = self._server.accept()
+            except OSError:
+                return
+            logging.info("Viewer connected from %s:%s", *address[:2])
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _read_hello(self, conn):
+        """The viewer's ``{"epoch": ..., "seq": ...}`` line, or ``{}`` if it sends nothing usable."""
+        conn.settimeout(self.handshake_timeout)
+        data = b""
+        try:
+            while b"\n" not in data and len(data) < 4096:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            hello = json.loads(data.split(b"\n", 1)[0] or b"{}")
+        except (socket.timeout, ValueError):
+            hello = {}
+        conn.settimeout(None)
+        return hello if isinstance(hello, dict) else {}
+
+    def _replay(self, hello):
+        """Lines the viewer is missing and whether it must reset first; must be called with ``_lock`` held."""
+        seq = hello.get("seq") if hello.get("epoch") == self.epoch else None
+        if isinstance(seq, int) and self._seq - len(self._recent) <= seq <= self._seq:
+            return list(islice(self._recent, len(self._recent) - (self._seq - seq), None)), False
+        return list(self._recent), True
+
+    def _serve_client(self, conn):
+        client_queue = queue.Queue(maxsize=self.client_queue_size)
+        registered = False
+        try:
+            with conn:
+                hello = self._read_hello(conn)
+                # Snapshot and registration under one lock: every row is either replayed or queued, once
+                with self._lock:
+                    backlog, reset = self._replay(hello)
+                    self._clients.append(client_queue)
+                    registered = True
+                conn.sendall((json.dumps({"epoch": self.epoch, "reset": reset}) + "\n").encode())
+                for start in range(0, len(backlog), 1000):
+                    conn.sendall(b"".join(backlog[start:start + 1000]))
+                while True:
+                    conn.sendall(client_queue.get())
+        except OSError:
+            logging.info("Viewer disconnected")
+        finally:
+            if registered:
+                with self._lock:
+                    self._clients.remove(client_queue)
+
+
+class SensorClient:
+    """Receive rows from a ``SensorPublisher`` and pass each to ``on_row``; reconnects on failure.
+
+    On reconnecting it asks only for the rows it has not seen. When the
+    publisher cannot provide exactly those (it restarted, or this client fell
+    behind its backlog) it replays everything it has, and ``on_reset`` is
+    called first so the receiver can drop what it already holds.
+    """
+
+    def __init__(self, address, on_row, on_reset=None, retry_interval=2.0):
+        self.address = address
+        self.on_row = on_row
+        self.on_reset = on_reset
+        self.retry_interval = retry_interval
+        self.epoch = None
+        self.seq = None
+
+    def run(self):
+        while True:
+            try:
+                with socket.create_connection(self.address) as conn, conn.makefile("r", encoding="utf-8") as stream:
+                    conn.sendall((json.dumps({"epoch": self.epoch, "seq": self.seq}) + "\n").encode())
+                    header = json.loads(stream.readline() or "null")
+                    if not isinstance(header, dict):
+                        raise OSError("no handshake from the sensor service")
+                    logging.info("Connected to sensor service at %s:%s", *self.address)
+                    if header["reset"] and self.on_reset is not None:
+                        self.on_reset()
+                    self.epoch = header["epoch"]
+                    for line in stream:
+                        message = json.loads(line)
+                        self.on_row(message["row"])
+                        self.seq = message["seq"]
+            except (OSError, ValueError) as e:
+                # ValueError: a line cut off by the disconnect
+                logging.error("Sensor service connection error: %s", e)
+            time.sleep(self.retry_interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """Parse ``host[:port]`` into a ``(host, port)`` tuple."""
+    host, _, port = text.rpartition(":") if ":" in text else (text, "", "")
+    return host or "127.0.0.1", int(port or default_port)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Headless ESP32 sensor ingestion service.")
+    parser.add_argument("--hosts", default="192.168.1.80", help="comma-separated ESP32 addresses")
+    parser.add_argument("--db", default="sensor_history.db", help="SQLite history file")
+    parser.add_argument("--retention", type=int, default=43200, help="rows kept in memory")
+    parser.add_argument("--listen", default=f"127.0.0.1:{DEFAULT_PORT}", help="viewer socket address")
+    parser.add_argument("--metrics", default=f"127.0.0.1:{METRICS_PORT}",
+                        help="Prometheus metrics address (empty to disable)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        serve_metrics(*parse_address(args.metrics, METRICS_PORT))
+
+    service = SensorService(parse_hosts(args.hosts), args.db, args.retention)
+    publisher = SensorPublisher(service, *parse_address(args.listen), backlog_rows=args.retention)
+    publisher.start()
+    try:
+        service.poller.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
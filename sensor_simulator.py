@@ -0,0 +1,108 @@
+"""Simulated ESP32 boards for benchmarks and tests.
+
+Each ``FakeBoard`` answers ``/getSensorData`` with the same JSON keys
+robot.ino sends, optionally after a delay or with an HTTP 500. A
+``FakeFleet`` serves many of them on local ports from one event loop.
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+from aiohttp import web
+
+
+class FakeBoard:
+    """One simulated robot.ino board: slowly drifting readings and a sequence number in ``moisture``."""
+
+    def __init__(self, seed, error_rate=0.0, delay=0.0):
+        self.random = random.Random(seed)
+        self.error_rate = error_rate
+        self.delay = delay
+        self.seq = 0
+        self.sent = {}  # seq -> perf_counter when the reading was served
+        self.state = {"temperature": 24.0, "humidity": 45.0, "ldrValue": 2000, "mq2Value": 300,
+                      "pitch": 0.0, "roll": 0.0, "yaw": 0.0}
+
+    def payload(self):
+        rnd, state = self.random, self.state
+        state["temperature"] += rnd.gauss(0, 0.05)
+        state["humidity"] = min(100.0, max(0.0, state["humidity"] + rnd.gauss(0, 0.2)))
+        state["ldrValue"] = min(4095, max(0, state["ldrValue"] + rnd.randint(-40, 40)))
+        state["mq2Value"] = min(4095, max(0, state["mq2Value"] + rnd.randint(-10, 10)))
+        for angle in ("pitch", "roll", "yaw"):
+            state[angle] = (state[angle] + rnd.gauss(0, 1.0)) % 360 - (180 if angle != "yaw" else 0)
+        self.seq += 1
+        # Same keys and rounding as robot.ino's getSensorData(); moisture carries the sequence number
+        return {"temperature": round(state["temperature"], 2), "humidity": round(state["humidity"], 2),
+                "ldrValue": state["ldrValue"], "mq2Value": state["mq2Value"], "moisture": self.seq,
+                "latitude": 27.717245, "longitude": 85.323960,
+                "pitch": round(state["pitch"], 2), "roll": round(state["roll"], 2), "yaw": round(state["yaw"], 2)}
+
+    async def handle(self, request):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.random.random() < self.error_rate:
+            return web.Response(status=500, text="sensor read failed")
+        payload = self.payload()
+        self.sent[payload["moisture"]] = time.perf_counter()
+        return web.Response(text=json.dumps(payload), content_type="application/json")
+
+
+class FakeFleet:
+    """Run ``count`` fake boards on local ports from one event loop in a daemon thread."""
+
+    def __init__(self, count, error_rate=0.0, delay=0.0, host="127.0.0.1"):
+        self.host = host
+        self.boards = [FakeBoard(seed, error_rate, delay) for seed in range(count)]
+        self.hosts = []
+        self._runners = []
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = None
+
+    async def _serve(self):
+        for board in self.boards:
+            app = web.Application()
+            app.router.add_get("/getSensorData", board.handle)
+            # A deliberately slow board must not hold up close() for aiohttp's default 60 s
+            runner = web.AppRunner(app, access_log=None, shutdown_timeout=1.0)
+            await runner.setup()
+            self._runners.append(runner)
+            sock = socket.socket()
+            sock.bind((self.host, 0))
+            await web.SockSite(runner, sock).start()
+            self.hosts.append(f"{self.host}:{sock.getsockname()[1]}")
+        self._ready.set()
+
+    async def _shutdown(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        # Handlers of a slow board may still be sleeping past the shutdown timeout
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self):
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._serve())
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def close(self):
+        """Stop every board and the fleet's event loop."""
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def board(self, host):
+        return self.boards[self.hosts.index(host)]
@@ -0,0 +1,270 @@
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from sensor_schema import pick_device
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_WINDOWS = (("1 min", 60), ("1 h", 3600), ("24 h", 86400))
+
+
+class RunningStats:
+    """Welford's online mean and variance."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, values):
+        """Fold a whole array in at once (Chan et al. parallel update)."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def variance(self):
+        """Population variance, matching ``np.var``."""
+        return self._m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count else math.nan
+
+
+class P2Quantile:
+    """Streaming quantile estimate in constant memory (Jain & Chlamtac's P-square algorithm)."""
+
+    def __init__(self, p):
+        self.p = p
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def seed(self, values):
+        """Initialise the markers from an array of past values, replacing any previous state."""
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        count = len(values)
+        if count < 5:
+            self._heights = []
+            for value in values:
+                self.push(value)
+            return
+        p = self.p
+        desired = [1, 1 + (count - 1) * p / 2, 1 + (count - 1) * p, 1 + (count - 1) * (1 + p) / 2, count]
+        positions = [1]
+        for i in range(1, 4):
+            positions.append(min(max(int(round(desired[i])), positions[-1] + 1), count - 4 + i))
+        positions.append(count)
+        self._positions = positions
+        self._desired = desired
+        self._heights = [float(values[pos - 1]) for pos in positions]
+
+    def push(self, value):
+        heights = self._heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= heights[k + 1]:
+                k += 1
+
+        positions = self._positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in range(1, 4):
+            d = self._desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                heights[i] = height
+                positions[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        heights = self._heights
+        if not heights:
+            return math.nan
+        if len(heights) < 5:
+            return float(np.quantile(heights, self.p))
+        return heights[2]
+
+
+class WindowExtrema:
+    """Min and max over a sliding time window using monotonic deques (amortised O(1))."""
+
+    def __init__(self, window):
+        self.window = window
+        self._min = deque()
+        self._max = deque()
+
+    def push(self, timestamp, value):
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((timestamp, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((timestamp, value))
+
+    def seed(self, timestamps, values, now):
+        """Rebuild both deques from past readings in a single vectorized pass."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        recent = timestamps >= now - self.window
+        timestamps, values = timestamps[recent], values[recent]
+        for target, accumulate, beats in ((self._min, np.minimum, np.less), (self._max, np.maximum, np.greater)):
+            target.clear()
+            if not len(values):
+                continue
+            # A reading stays in the deque only if it strictly beats everything after it
+            suffix = accumulate.accumulate(values[::-1])[::-1]
+            keep = np.append(beats(values[:-1], suffix[1:]), True)
+            target.extend(zip(timestamps[keep].tolist(), values[keep].tolist()))
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        for target in (self._min, self._max):
+            while target and target[0][0] < cutoff:
+                target.popleft()
+
+    def extrema(self, now):
+        self._expire(now)
+        if not self._min:
+            return math.nan, math.nan
+        return self._min[0][1], self._max[0][1]
+
+
+class SensorStatistics:
+    """Incrementally maintained statistics for every sensor channel, kept separately for each board.
+
+    ``update()`` is called once per ingested reading; ``summary()`` then costs
+    the same no matter how much history has been collected. Rows are split
+    by their ``device_column`` so interleaved readings from several boards
+    are never blended into one distribution.
+    """
+
+    def __init__(self, channels, quantiles=DEFAULT_QUANTILES, windows=DEFAULT_WINDOWS, device_column="DEVICE"):
+        self.channels = list(channels)
+        self.quantiles = tuple(quantiles)
+        self.windows = tuple(windows)
+        self.device_column = device_column
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every reading seen so far."""
+        with self._lock:
+            self._boards = {}
+
+    def _new_board(self):
+        """Empty ``(running, quantiles, extrema)`` state for one board."""
+        return ({ch: RunningStats() for ch in self.channels},
+                {ch: [P2Quantile(q) for q in self.quantiles] for ch in self.channels},
+                {ch: [WindowExtrema(seconds) for _, seconds in self.windows] for ch in self.channels})
+
+    def _board(self, device):
+        """The state of ``device``, created on first use; must be called with ``_lock`` held."""
+        state = self._boards.get(device)
+        if state is None:
+            state = self._boards[device] = self._new_board()
+        return state
+
+    def devices(self):
+        """The boards seen so far, in order of first appearance."""
+        with self._lock:
+            return list(self._boards)
+
+    def update(self, row, timestamp):
+        """Fold one reading (``{channel: value}``) taken at ``timestamp`` epoch seconds into the statistics."""
+        with self._lock:
+            running, quantiles, extrema = self._board(row.get(self.device_column))
+            for ch in self.channels:
+                value = float(row[ch])
+                if math.isnan(value):
+                    continue
+                running[ch].push(value)
+                for estimator in quantiles[ch]:
+                    estimator.push(value)
+                for window in extrema[ch]:
+                    window.push(timestamp, value)
+
+    def seed(self, frame, timestamps, now=None):
+        """Initialise the statistics from past readings with vectorized passes over each board's columns."""
+        now = time.time() if now is None else now
+        timestamps = np.asarray(timestamps)
+        self.reset()
+        if self.device_column in frame:
+            boards = np.asarray(frame[self.device_column])
+            groups = [(device, boards == device) for device in dict.fromkeys(boards.tolist())]
+        else:
+            groups = [(None, np.ones(len(timestamps), dtype=bool))]
+        with self._lock:
+            for device, rows in groups:
+                running, quantiles, extrema = self._board(device)
+                for ch in self.channels:
+                    values = np.asarray(frame[ch], dtype=np.float64)
+                    valid = rows & ~np.isnan(values)
+                    running[ch].merge(values[valid])
+                    for estimator in quantiles[ch]:
+                        estimator.seed(values[valid])
+                    for window in extrema[ch]:
+                        window.seed(timestamps[valid], values[valid], now)
+
+    def summary(self, channel, device=None, now=None):
+        """Return count, mean, standard deviation, quantiles and windowed min/max for one board's channel.
+
+        ``device`` may be left out while only one board has reported; see ``sensor_schema.pick_device``.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._boards:
+                running, quantiles, extrema = self._boards[pick_device(self._boards, device)]
+            else:
+                running, quantiles, extrema = self._new_board()
+            running = running[channel]
+            return {
+                "count": running.count,
+                "mean": running.mean if running.count else math.nan,
+                "std": running.std,
+                "quantiles": {q: est.value for q, est in zip(self.quantiles, quantiles[channel])},
+                "windows": {label: window.extrema(now)
+                            for (label, _), window in zip(self.windows, extrema[channel])},
+            }
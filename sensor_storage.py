@@ -0,0 +1,162 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+
+from metrics import REGISTRY
+from sensor_schema import parse_timestamp
+
+WRITE_SECONDS = REGISTRY.histogram("sensor_db_write_seconds", "Time to commit one batch of readings to SQLite")
+# Shared by every stage that can lose a reading (storage, payload parsing, viewer queues), one label per reason
+DROPPED = REGISTRY.counter("sensor_dropped_samples_total", "Readings lost before reaching their destination",
+                           ["reason"])
+
+
+class SensorDatabase:
+    """Persistent sensor history in a SQLite database running in WAL mode.
+
+    Readings are queued by ``append()`` and written by a background thread in
+    batched transactions, so the poller never waits on disk. Rows are indexed
+    by timestamp, which keeps time-range reads cheap and insert cost flat as the
+    history grows (new rows always land at the right edge of the index).
+
+    WAL mode gives crash recovery for free: a transaction is either fully in the
+    database or not at all, and an interrupted session is replayed from the
+    write-ahead log the next time the file is opened.
+    """
+
+    def __init__(self, path, columns, dtypes=None, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.columns = list(columns)
+        self.dtypes = {col: np.dtype((dtypes or {}).get(col, np.float64)) for col in self.columns}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+
+        with closing(self._connect()) as conn, conn:
+            column_defs = ", ".join(f'"{col}" {self._sql_type(col)}' for col in self.columns)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS readings (id INTEGER PRIMARY KEY, {column_defs})")
+            conn.execute('CREATE INDEX IF NOT EXISTS readings_timestamp ON readings ("TIMESTAMP")')
+
+        placeholders = ", ".join("?" for _ in self.columns)
+        quoted = ", ".join(f'"{col}"' for col in self.columns)
+        self._insert_sql = f"INSERT INTO readings ({quoted}) VALUES ({placeholders})"
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _sql_type(self, col):
+        kind = self.dtypes[col].kind
+        return "INTEGER" if kind in "iu" else "REAL" if kind == "f" else "TEXT"
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write_loop(self):
+        conn = self._connect()
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                with conn:
+                    conn.executemany(self._insert_sql, [[row[col] for col in self.columns] for row in batch])
+                WRITE_SECONDS.observe(time.perf_counter() - started)
+            except sqlite3.Error as e:
+                DROPPED.inc("db_write_error", amount=len(batch))
+                logging.error("Error writing %d readings to %s: %s", len(batch), self.path, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def append(self, row):
+        """Queue a single reading for the next batched commit."""
+        self._queue.put(row)
+
+    def pending(self):
+        """Number of readings queued but not yet committed."""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every queued reading has been committed."""
+        self._queue.join()
+
+    def close(self):
+        """Commit pending readings and stop the writer thread."""
+        self._closed.set()
+        self._writer.join()
+
+    def _where(self, start, end, device):
+        """``(" WHERE ..." or "", params)`` selecting readings in a time range and, optionally, of one device."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('"TIMESTAMP" >= ?')
+            params.append(parse_timestamp(start))
+        if end is not None:
+            clauses.append('"TIMESTAMP" <= ?')
+            params.append(parse_timestamp(end))
+        if device is not None:
+            clauses.append('"DEVICE" = ?')
+            params.append(device)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _range_query(self, start, end, device, order="ASC", limit=None):
+        where, params = self._where(start, end, device)
+        quoted = ", ".join(f'"{col}"' for col in self.columns)
+        sql = f'SELECT {quoted} FROM readings{where} ORDER BY "TIMESTAMP" {order}, id {order}'
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    def count(self, start=None, end=None, device=None):
+        """Return the number of committed readings in a time range (bounds as accepted by ``parse_timestamp``)."""
+        where, params = self._where(start, end, device)
+        with closing(sqlite3.connect(self.path)) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM readings{where}", params).fetchone()[0]
+
+    def read_range(self, start=None, end=None, device=None):
+        """Return readings with ``start <= TIMESTAMP <= end`` as a DataFrame."""
+        import pandas as pd
+
+        sql, params = self._range_query(start, end, device)
+        with closing(sqlite3.connect(self.path)) as conn:
+            return self._typed(pd.read_sql_query(sql, conn, params=params))
+
+    def iter_range(self, start=None, end=None, device=None, chunksize=50000):
+        """Yield readings in a time range as DataFrame chunks of at most ``chunksize`` rows."""
+        import pandas as pd
+
+        sql, params = self._range_query(start, end, device)
+        with closing(sqlite3.connect(self.path)) as conn:
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunksize):
+                yield self._typed(chunk)
+
+    def latest(self, count):
+        """Return the ``count`` most recent readings, oldest first, as ``{column: array}``.
+
+        Plain NumPy arrays keep start-up recovery from having to import pandas.
+        """
+        sql, params = self._range_query(None, None, None, order="DESC", limit=count)
+        with closing(sqlite3.connect(self.path)) as conn:
+            rows = conn.execute(sql, params).fetchall()[::-1]
+        columns = list(zip(*rows)) or [()] * len(self.columns)
+        return {col: np.array(values, dtype=self.dtypes[col]) for col, values in zip(self.columns, columns)}
+
+    def _typed(self, frame):
+        return frame.astype({col: dtype for col, dtype in self.dtypes.items() if dtype.kind != "O"}, copy=False)
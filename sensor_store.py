@@ -0,0 +1,120 @@
+import threading
+
+import numpy as np
+
+
+class SensorStore:
+    """Preallocated columnar ring buffer holding the most recent sensor readings.
+
+    Each column lives in its own NumPy array sized at twice the retention window.
+    Rows are written one after another; when the write cursor reaches the end,
+    the last ``capacity`` rows are moved into a freshly allocated buffer, so the
+    cost of an append is amortized O(1) and memory never grows past
+    ``2 * capacity`` rows per column.
+
+    Because a full buffer is replaced rather than compacted in place, any view
+    handed out earlier keeps pointing at unchanged memory, which lets readers on
+    the Tk thread use ``column()``/``frame()`` without copying.
+    """
+
+    def __init__(self, columns, capacity=43200, dtypes=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be a positive number of rows")
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.dtypes = {col: np.dtype((dtypes or {}).get(col, np.float64)) for col in self.columns}
+        self._lock = threading.Lock()
+        self._buffers = self._allocate()
+        self._start = 0
+        self._end = 0
+        self.appended = 0  # readings ever appended; doubles as the sequence number of the next row
+        self.generation = 0  # bumped by clear() so indexes over the store know to rebuild
+
+    def _allocate(self):
+        return {col: np.empty(self.capacity * 2, dtype=self.dtypes[col]) for col in self.columns}
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def empty(self):
+        return self._end == self._start
+
+    def append(self, row):
+        """Append a single reading given as a ``{column: value}`` mapping."""
+        with self._lock:
+            if self._end == self.capacity * 2:
+                keep = self.capacity - 1
+                fresh = self._allocate()
+                for col in self.columns:
+                    fresh[col][:keep] = self._buffers[col][self._end - keep:self._end]
+                self._buffers = fresh
+                self._start, self._end = 0, keep
+
+            for col in self.columns:
+                self._buffers[col][self._end] = row[col]
+            self._end += 1
+            self.appended += 1
+            if self._end - self._start > self.capacity:
+                self._start += 1
+
+    def extend(self, frame):
+        """Append many readings at once from a DataFrame (or a ``{column: array}`` mapping)."""
+        arrays = {col: np.asarray(frame[col])[-self.capacity:] for col in self.columns}
+        count = len(arrays[self.columns[0]])
+        with self._lock:
+            if self._end + count > self.capacity * 2:
+                keep = min(self._end - self._start, self.capacity - count)
+                fresh = self._allocate()
+                for col in self.columns:
+                    fresh[col][:keep] = self._buffers[col][self._end - keep:self._end]
+                self._buffers = fresh
+                self._start, self._end = 0, keep
+
+            for col in self.columns:
+                self._buffers[col][self._end:self._end + count] = arrays[col]
+            self._end += count
+            self.appended += count
+            self._start = max(self._start, self._end - self.capacity)
+
+    def clear(self):
+        """Drop every stored reading."""
+        with self._lock:
+            self._buffers = self._allocate()
+            self._start = self._end = 0
+            self.generation += 1
+
+    def column(self, name):
+        """Return a read-only NumPy view of a single column, oldest first."""
+        with self._lock:
+            view = self._buffers[name][self._start:self._end]
+        view.flags.writeable = False
+        return view
+
+    def view(self):
+        """Return ``(first, columns)``: the sequence number of the oldest retained row and
+        read-only views of every column, all taken from the same consistent snapshot."""
+        with self._lock:
+            start, end, buffers = self._start, self._end, self._buffers
+            first = self.appended - (end - start)
+        columns = {}
+        for col in self.columns:
+            columns[col] = buffers[col][start:end]
+            columns[col].flags.writeable = False
+        return first, columns
+
+    def last(self, name):
+        """Return the latest value of a column, or ``None`` when the store is empty."""
+        with self._lock:
+            if self._end == self._start:
+                return None
+            return self._buffers[name][self._end - 1]
+
+    def frame(self):
+        """Return the retained readings as a DataFrame backed by the store's arrays."""
+        import pandas as pd
+
+        with self._lock:
+            start, end, buffers = self._start, self._end, self._buffers
+        return pd.DataFrame({col: buffers[col][start:end] for col in self.columns},
+                            columns=self.columns, copy=False)
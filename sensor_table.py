@@ -0,0 +1,92 @@
+import time
+from tkinter import ttk
+
+from metrics import REGISTRY
+from sensor_schema import format_column
+
+REFRESH_SECONDS = REGISTRY.histogram("sensor_table_refresh_seconds", "Time to redraw the visible table rows")
+
+
+class VirtualTable:
+    """Treeview that only ever holds the rows currently on screen.
+
+    The table keeps ``visible_rows`` Treeview items and rewrites their values
+    from the backing ``SensorStore`` whenever the user scrolls or new data
+    arrives, so the widget count stays constant no matter how much history is
+    retained. ``notify()`` may be called from any thread; pending changes are
+    coalesced into one refresh per frame, at most ``max_refresh_rate`` times a
+    second. While scrolled to the bottom, the table follows the newest rows.
+    Values are only formatted for display for the rows on screen.
+    """
+
+    def __init__(self, parent, store, columns, visible_rows=15, max_refresh_rate=10, column_width=120):
+        self.store = store
+        self.columns = list(columns)
+        self.visible_rows = visible_rows
+        self.refresh_interval = max(1, int(1000 / max_refresh_rate))
+        self.top = 0
+        self.follow = True
+        self._dirty = True
+
+        self.tree = ttk.Treeview(parent, columns=self.columns, show="headings", height=visible_rows)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, anchor="center", width=column_width)
+        self._items = [self.tree.insert("", "end", values=()) for _ in range(visible_rows)]
+        self._shown = [None] * visible_rows
+
+        self.tree.bind("<MouseWheel>", lambda event: self._scroll(-1 if event.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda event: self._scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self._scroll(1, "units"))
+        self.tree.after(self.refresh_interval, self._refresh_loop)
+
+    def notify(self):
+        """Mark the table as stale; it is redrawn on the next frame."""
+        self._dirty = True
+
+    def _refresh_loop(self):
+        if self._dirty:
+            self.refresh()
+        self.tree.after(self.refresh_interval, self._refresh_loop)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._move_to(int(float(amount) * len(self.store)))
+        else:
+            self._scroll(int(amount), unit)
+
+    def _scroll(self, amount, unit):
+        step = self.visible_rows if unit == "pages" else 1
+        self._move_to(self.top + amount * step)
+        return "break"
+
+    def _move_to(self, top):
+        max_top = max(0, len(self.store) - self.visible_rows)
+        self.top = min(max(0, top), max_top)
+        self.follow = self.top >= max_top
+        self.refresh()
+
+    def refresh(self):
+        """Rewrite the visible rows from the store."""
+        started = time.perf_counter()
+        self._dirty = False
+        _, columns = self.store.view()
+        total = len(columns[self.columns[0]])
+        if self.follow:
+            self.top = max(0, total - self.visible_rows)
+        self.top = min(self.top, max(0, total - self.visible_rows))
+
+        window = [format_column(col, columns[col][self.top:self.top + self.visible_rows]) for col in self.columns]
+        rows = list(zip(*window))
+        for i, item in enumerate(self._items):
+            values = rows[i] if i < len(rows) else ()
+            if values != self._shown[i]:
+                self.tree.item(item, values=values)
+                self._shown[i] = values
+
+        if total > self.visible_rows:
+            self.scrollbar.set(self.top / total, (self.top + self.visible_rows) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        REFRESH_SECONDS.observe(time.perf_counter() - started)
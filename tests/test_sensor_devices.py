@@ -0,0 +1,48 @@
+"""Statistics and heatmaps keep interleaved boards apart."""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sensor_heatmap import TimeGrid  # noqa: E402
+from sensor_stats import SensorStatistics  # noqa: E402
+
+
+def interleaved(count=20):
+    """Two boards reporting in turn: ``robot`` reads 10, ``bed`` reads 30."""
+    return {"DEVICE": np.array(["robot", "bed"] * count, dtype=object),
+            "TEMPERATURE": np.array([10.0, 30.0] * count)}
+
+
+def test_statistics_are_kept_per_board():
+    now = time.time()
+    frame = interleaved()
+    stats = SensorStatistics(["TEMPERATURE"])
+    for device, value in zip(frame["DEVICE"], frame["TEMPERATURE"]):
+        stats.update({"DEVICE": device, "TEMPERATURE": value}, now)
+
+    seeded = SensorStatistics(["TEMPERATURE"])
+    seeded.seed(frame, np.full(len(frame["DEVICE"]), now), now)
+    for summary in (stats.summary, seeded.summary):
+        robot, bed = summary("TEMPERATURE", "robot", now), summary("TEMPERATURE", "bed", now)
+        assert (robot["count"], robot["mean"], robot["std"]) == (20, 10.0, 0.0)
+        assert bed["windows"]["1 min"] == (30.0, 30.0)
+    assert stats.devices() == seeded.devices() == ["robot", "bed"]
+    with pytest.raises(ValueError):
+        stats.summary("TEMPERATURE")
+
+
+def test_heatmap_cells_are_kept_per_board():
+    now = time.time()
+    frame = interleaved()
+    grid = TimeGrid(["TEMPERATURE"], period=3600, bucket=60, rows=2)
+    grid.seed(frame, np.full(len(frame["DEVICE"]), now), now)
+    assert np.nanmax(grid.means("TEMPERATURE", "robot")) == 10.0
+    grid.update({"DEVICE": "bed", "TEMPERATURE": 40.0}, now)
+    assert np.nanmax(grid.means("TEMPERATURE", "bed")) == pytest.approx((20 * 30.0 + 40.0) / 21)
+    with pytest.raises(ValueError):
+        grid.means("TEMPERATURE")
@@ -0,0 +1,61 @@
+"""Exported files hold the readings as they were stored."""
+import os
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sensor_export import export_xlsx  # noqa: E402
+from sensor_schema import DTYPES, to_python  # noqa: E402
+
+SHEET = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def readings():
+    columns = {
+        "DEVICE": ["robot", "bed", "robot"],
+        "LIGHT INTENSITY": [2000, 4095, 0],
+        "GAS VALUE": [300, 301, 302],
+        "HUMIDITY": [41.3, 45.07, 100.0],
+        "TEMPERATURE": [23.1, -4.2, 36.65],
+        "PITCH": [0.1, -179.99, 12.34],
+        "ROLL": [1.5, 2.25, -0.3],
+        "YAW": [359.9, 0.0, 180.01],
+    }
+    return pd.DataFrame({name: np.array(values, dtype=DTYPES[name]) for name, values in columns.items()}), columns
+
+
+def sheet_cells(path):
+    """Row-major cell values of the first sheet, numbers as floats."""
+    with zipfile.ZipFile(path) as xlsx:
+        root = ET.fromstring(xlsx.read("xl/worksheets/sheet1.xml"))
+    rows = []
+    for row in root.iter(f"{SHEET}row"):
+        cells = []
+        for cell in row.iter(f"{SHEET}c"):
+            value = cell.find(f"{SHEET}v")
+            cells.append(float(value.text) if value is not None else cell.find(f".//{SHEET}t").text)
+        rows.append(cells)
+    return rows
+
+
+def test_to_python_keeps_the_shortest_float32_form():
+    assert to_python(np.array([23.1, 41.3], dtype=np.float32)) == [23.1, 41.3]
+    assert to_python(np.array([7, 8], dtype=np.uint16)) == [7, 8]
+
+
+def test_xlsx_cells_equal_the_readings(tmp_path):
+    pytest.importorskip("xlsxwriter")
+    frame, columns = readings()
+    path = str(tmp_path / "readings.xlsx")
+    assert export_xlsx([frame.iloc[:2], frame.iloc[2:]], path) == 3
+
+    header, *rows = sheet_cells(path)
+    assert header == list(columns)
+    assert [list(row) for row in zip(*rows)] == [[float(v) if not isinstance(v, str) else v for v in values]
+                                                 for values in columns.values()]
@@ -0,0 +1,112 @@
+"""SensorPoller against local stub boards (``sensor_simulator.FakeFleet``).
+
+    python -m pytest tests
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sensor_poller import POLL_ERRORS, POLLS, SensorPoller, make_device  # noqa: E402
+from sensor_simulator import FakeFleet  # noqa: E402
+
+INTERVAL = 0.05
+
+
+class Readings:
+    """Collects ``on_reading`` calls as ``{device_id: [arrival times]}``."""
+
+    def __init__(self):
+        self.times = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, device_id, payload):
+        with self._lock:
+            self.times.setdefault(device_id, []).append(time.perf_counter())
+
+    def count(self, device_id):
+        with self._lock:
+            return len(self.times.get(device_id, []))
+
+    def max_gap(self, device_id):
+        with self._lock:
+            times = self.times.get(device_id, [])
+        return max((b - a for a, b in zip(times, times[1:])), default=float("inf"))
+
+
+def closed_port():
+    """An address nothing listens on, so every poll is refused straight away."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"127.0.0.1:{port}"
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_slow_and_dead_boards_do_not_delay_a_healthy_one():
+    fleet = FakeFleet(2).start()
+    try:
+        slow_host, healthy_host = fleet.hosts
+        fleet.board(slow_host).delay = 30.0  # answers long after the poller gives up
+        # Ids are unique to this test so the shared counters start at zero
+        healthy = make_device(healthy_host, "healthy-1", interval=INTERVAL, timeout=1.0)
+        slow = make_device(slow_host, "slow-1", interval=INTERVAL, timeout=1.0)
+        dead = make_device(closed_port(), "dead-1", interval=INTERVAL, timeout=1.0)
+        readings = Readings()
+        poller = SensorPoller([slow, dead, healthy], readings)
+        thread = poller.start()
+        try:
+            assert wait_for(lambda: readings.count("healthy-1") >= 20)
+            # Let the slow board time out at least once while the healthy one keeps going
+            time.sleep(1.5)
+        finally:
+            poller.stop()
+            thread.join()
+    finally:
+        fleet.close()
+
+    assert readings.count("slow-1") == 0
+    assert readings.count("dead-1") == 0
+    # A poller that waited on the slow board would stall the healthy one for the full 1 s timeout
+    assert readings.max_gap("healthy-1") < 0.5
+    assert POLL_ERRORS.value("slow-1") >= 1
+    # Refusals are instant, so only the exponential backoff keeps the dead board from being polled every interval
+    assert POLL_ERRORS.value("dead-1") == POLLS.value("dead-1")
+    assert POLLS.value("dead-1") < POLLS.value("healthy-1") / 4
+
+
+def test_set_devices_adds_and_removes_boards_while_running():
+    fleet = FakeFleet(2).start()
+    try:
+        first = make_device(fleet.hosts[0], "first-2", interval=INTERVAL)
+        second = make_device(fleet.hosts[1], "second-2", interval=INTERVAL)
+        readings = Readings()
+        poller = SensorPoller([first], readings)
+        thread = poller.start()
+        try:
+            assert wait_for(lambda: readings.count("first-2") >= 3)
+            poller.set_devices([second])
+            assert wait_for(lambda: readings.count("second-2") >= 3)
+            # Give a poll that was already in flight for the removed board time to land
+            time.sleep(0.2)
+            stopped_at = readings.count("first-2")
+            time.sleep(5 * INTERVAL)
+            assert readings.count("first-2") == stopped_at
+            assert readings.count("second-2") >= 6
+        finally:
+            poller.stop()
+            thread.join()
+    finally:
+        fleet.close()
@@ -0,0 +1,384 @@
+"""Titanic survival predictions from the trained scikit-learn pipeline (pipe.pkl).
+
+    python titanic_predict.py batch passengers.csv --output predictions.csv
+    python titanic_predict.py batch passengers.parquet --chunk-size 50000
+    cat passengers.jsonl | python titanic_predict.py stream > predictions.jsonl
+    python titanic_predict.py serve --port 8700
+    curl -d '{"Pclass": 1, "Sex": "female", "Age": 31, "SibSp": 0, "Parch": 0, "Fare": 100, "Embarked": "S"}' \\
+        http://127.0.0.1:8700/predict
+
+The pipeline from Code_for_pred_using_pipeline.ipynb is unpickled once.
+Rows go through it a chunk at a time as one DataFrame, so every step
+(imputers, one-hot encoder, scaler, SelectKBest, tree) works on whole
+columns instead of one hand-built row. Records are dicts keyed by the seven
+feature names, or sequences in ``FEATURES`` order; missing Age/Embarked
+values are left to the pipeline's imputers, and a record missing any other
+feature gets an error in place of its prediction without holding up the
+rest of its chunk. ``batch`` and ``stream`` report
+rows/sec and per-chunk latency; ``serve`` exposes request latency and row
+counters in the Prometheus text format on ``/metrics``.
+"""
+import argparse
+import json
+import logging
+import pickle
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from metrics import REGISTRY
+from sensor_export import export_chunks
+
+FEATURES = ("Pclass", "Sex", "Age", "SibSp", "Parch", "Fare", "Embarked")  # column order the pipeline was fit on
+CATEGORICAL = ("Sex", "Embarked")
+REQUIRED = ("Pclass", "Sex", "SibSp", "Parch", "Fare")  # the pipeline imputes only Age and Embarked
+ID_COLUMN = "PassengerId"  # copied through to the output when present
+DEFAULT_PORT = 8700
+DEFAULT_CHUNK_SIZE = 10000
+
+ROWS = REGISTRY.counter("titanic_rows_total", "Passengers predicted", ["source"])
+CHUNK_SECONDS = REGISTRY.histogram("titanic_chunk_seconds", "Time to predict one chunk of rows", ["source"])
+REQUEST_SECONDS = REGISTRY.histogram("titanic_request_seconds", "Time from HTTP request received to response ready")
+ERRORS = REGISTRY.counter("titanic_errors_total", "Requests or chunks that failed", ["reason"])
+
+
+def load_pipeline(path="pipe.pkl"):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _as_dict(record):
+    if isinstance(record, dict):
+        return record
+    if isinstance(record, (list, tuple)) and len(record) == len(FEATURES):
+        return dict(zip(FEATURES, record))
+    return None
+
+
+def to_frame(records):
+    """Build the pipeline's input DataFrame from a DataFrame, dicts or 7-value sequences.
+
+    Returns ``(frame, errors)``. ``errors`` has one entry per record: ``None``
+    if it can be predicted, else the reason it cannot (a malformed record, or
+    a missing or non-numeric feature the pipeline has no imputer for).
+    ``frame`` holds only the usable records, in order.
+    """
+    if isinstance(records, pd.DataFrame):
+        missing = [column for column in FEATURES if column not in records.columns]
+        if missing:
+            raise ValueError(f"missing feature columns: {missing}")
+        columns = {column: records[column].to_numpy() for column in FEATURES}
+        errors = [None] * len(records)
+    else:
+        records = [_as_dict(record) for record in records]
+        errors = [None if record is not None else f"expected an object or {len(FEATURES)} values"
+                  for record in records]
+        columns = {column: [(record or {}).get(column) for record in records] for column in FEATURES}
+    data = {}
+    for column in FEATURES:
+        if column in CATEGORICAL:
+            values = np.array(columns[column], dtype=object)  # a copy: Arrow-backed columns are read-only
+            invalid = pd.isna(values)
+            values[invalid] = np.nan  # None and NaN alike are imputed by the pipeline
+        else:
+            values = pd.to_numeric(pd.Series(columns[column]), errors="coerce").to_numpy(dtype=np.float64)
+            invalid = np.isnan(values)
+        data[column] = values
+        if column in REQUIRED:
+            for i in np.flatnonzero(invalid):
+                if errors[i] is None:
+                    value = columns[column][i]
+                    errors[i] = f"missing {column}" if pd.isna(value) else f"invalid {column}: {value!r}"
+    frame = pd.DataFrame(data, columns=list(FEATURES))
+    if any(error is not None for error in errors):
+        frame = frame[np.array([error is None for error in errors])].reset_index(drop=True)
+    return frame, errors
+
+
+class Predictor:
+    """The loaded pipeline behind one vectorized ``predict(records)`` call."""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.has_proba = hasattr(pipe, "predict_proba")
+        if self.has_proba:
+            self.classes = np.asarray(pipe.classes_)
+            # Column of predict_proba that is the probability of surviving (class 1)
+            self.survived_column = int(np.flatnonzero(self.classes == 1)[0]) if (self.classes == 1).any() else -1
+
+    def predict(self, records, source="batch"):
+        """Return ``(survived, probability, errors)``, each with one entry per record.
+
+        Records that cannot be predicted get ``survived`` -1, ``probability`` NaN
+        and the reason in ``errors`` (``None`` for the others); the rest of the
+        chunk is predicted as usual. ``probability`` is ``None`` if the model
+        has no ``predict_proba``.
+        """
+        started = time.perf_counter()
+        frame, errors = to_frame(records)
+        good = np.array([error is None for error in errors], dtype=bool)
+        survived = np.full(len(errors), -1, dtype=np.int64)
+        probability = np.full(len(errors), np.nan) if self.has_proba else None
+        if len(frame):
+            if self.has_proba:
+                proba = self.pipe.predict_proba(frame)
+                # argmax like pipe.predict, so a 0.5/0.5 leaf goes to the first class as it does there
+                survived[good] = self.classes[proba.argmax(1)]
+                probability[good] = proba[:, self.survived_column]
+            else:
+                survived[good] = np.asarray(self.pipe.predict(frame))
+        CHUNK_SECONDS.observe(time.perf_counter() - started, source)
+        ROWS.inc(source, amount=len(frame))
+        if len(frame) < len(errors):
+            ERRORS.inc("invalid_record", amount=len(errors) - len(frame))
+        return survived, probability, errors
+
+
+def result_record(i, survived, probability, errors, record=None):
+    """JSON-ready result for record ``i`` of a ``predict`` call, with its PassengerId if it had one."""
+    result = {"error": errors[i]} if errors[i] is not None else {"Survived": int(survived[i])}
+    if errors[i] is None and probability is not None:
+        result["Probability"] = float(probability[i])
+    if isinstance(record, dict) and ID_COLUMN in record:
+        result[ID_COLUMN] = record[ID_COLUMN]
+    return result
+
+
+# === Batch input ===
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrame chunks of a CSV or Parquet file, reading only the columns that are used."""
+    wanted = set(FEATURES) | {ID_COLUMN}
+    if path.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in parquet.schema_arrow.names if name in wanted]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=lambda name: name in wanted)
+
+
+def with_predictions(chunk, survived, probability, errors):
+    """Output rows for ``chunk``; rows that could not be predicted have Survived -1 and an Error."""
+    out = pd.DataFrame({ID_COLUMN: chunk[ID_COLUMN].to_numpy()} if ID_COLUMN in chunk else {})
+    out["Survived"] = survived
+    if probability is not None:
+        out["Probability"] = probability
+    out["Error"] = ["" if error is None else error for error in errors]
+    return out
+
+
+def report(rows, seconds, chunk_seconds):
+    chunk_ms = np.asarray(chunk_seconds) * 1000
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "chunks": len(chunk_ms),
+        "chunk_p50_ms": float(np.percentile(chunk_ms, 50)) if len(chunk_ms) else 0.0,
+        "chunk_p99_ms": float(np.percentile(chunk_ms, 99)) if len(chunk_ms) else 0.0,
+    }
+
+
+def predict_file(predictor, path, output, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Predict every row of ``path`` (CSV/Parquet) into ``output`` (CSV/Parquet/XLSX); returns throughput stats.
+
+    Output goes through ``sensor_export``, one chunk in memory at a time (a row
+    group per chunk for Parquet).
+    """
+    started = time.perf_counter()
+    chunk_seconds = []
+
+    def predictions():
+        for chunk in read_chunks(path, chunk_size):
+            mark = time.perf_counter()
+            out = with_predictions(chunk, *predictor.predict(chunk))
+            chunk_seconds.append(time.perf_counter() - mark)
+            yield out
+
+    rows = export_chunks(predictions(), output)
+    return report(rows, time.perf_counter() - started, chunk_seconds)
+
+
+# === Streamed records ===
+def record_chunks(lines, chunk_size=1000, max_wait_ms=50.0):
+    """Group JSON lines into chunks of up to ``chunk_size`` records.
+
+    A chunk is cut early once ``max_wait_ms`` has passed since its first record,
+    so a slow stream still gets answers promptly.
+    """
+    pending = queue.Queue(maxsize=chunk_size * 4)
+    done = object()
+
+    def feed():
+        for line in lines:
+            if line.strip():
+                pending.put(line)
+        pending.put(done)
+
+    threading.Thread(target=feed, daemon=True).start()
+    finished = False
+    while not finished:
+        item = pending.get()
+        if item is done:
+            break
+        chunk = [item]
+        deadline = time.perf_counter() + max_wait_ms / 1000.0
+        while len(chunk) < chunk_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is done:
+                finished = True
+                break
+            chunk.append(item)
+        yield chunk
+
+
+def predict_stream(predictor, lines, out, chunk_size=1000, max_wait_ms=50.0):
+    """Read JSON records from ``lines`` and write one JSON line per record to ``out``, in order.
+
+    A record that cannot be predicted (not JSON, or missing a feature) gets an
+    ``{"error": ...}`` line instead of a prediction, so output line ``n``
+    always answers input line ``n``.
+    """
+    started = time.perf_counter()
+    rows, chunk_seconds = 0, []
+    for chunk in record_chunks(lines, chunk_size, max_wait_ms):
+        records, bad_json = [], {}
+        for i, line in enumerate(chunk):
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(None)
+                bad_json[i] = f"not JSON: {e}"
+        mark = time.perf_counter()
+        try:
+            survived, probability, errors = predictor.predict(records, "stream")
+        except (ValueError, TypeError) as e:
+            ERRORS.inc("failed_chunk")
+            logging.warning(f"Could not predict a chunk of {len(records)} records: {e}")
+            survived, probability, errors = None, None, [f"prediction failed: {e}"] * len(records)
+        chunk_seconds.append(time.perf_counter() - mark)
+        errors = [bad_json.get(i, error) for i, error in enumerate(errors)]
+        for i, record in enumerate(records):
+            out.write(json.dumps(result_record(i, survived, probability, errors, record)) + "\n")
+        out.flush()
+        rows += len(records)
+    return report(rows, time.perf_counter() - started, chunk_seconds)
+
+
+# === HTTP ===
+def make_handler(predictor):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for clients sending many requests
+
+        def _send(self, status, body, content_type="application/json"):
+            body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, REGISTRY.render(), "text/plain; version=0.0.4; charset=utf-8")
+            elif self.path == "/health":
+                self._send(200, json.dumps({"status": "ok", "features": FEATURES}))
+            else:
+                self._send(404, json.dumps({"error": "not found"}))
+
+        def do_POST(self):
+            """Body: one record, or a list of records; the response mirrors that shape."""
+            started = time.perf_counter()
+            try:
+                # Read the whole body first, even for an unknown path: on a keep-alive connection
+                # anything left unread would be parsed as the next request
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            except ValueError:
+                self.close_connection = True
+                self._send(400, json.dumps({"error": "invalid Content-Length"}))
+                return
+            if self.path != "/predict":
+                self._send(404, json.dumps({"error": "not found"}))
+                return
+            try:
+                payload = json.loads(body)
+                single = not isinstance(payload, list) or (payload and not isinstance(payload[0], (dict, list)))
+                records = [payload] if single else payload
+                survived, probability, errors = predictor.predict(records, "http")
+            except (ValueError, TypeError) as e:
+                ERRORS.inc("bad_request")
+                self._send(400, json.dumps({"error": str(e)}))
+                return
+            if single and errors[0] is not None:
+                self._send(400, json.dumps({"error": errors[0]}))
+                return
+            results = [result_record(i, survived, probability, errors, record) for i, record in enumerate(records)]
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.observe(elapsed)
+            body = dict(results[0]) if single else {"predictions": results}
+            body["latency_ms"] = elapsed * 1000
+            self._send(200, json.dumps(body))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Titanic survival predictions from pipe.pkl.")
+    parser.add_argument("--model", default="pipe.pkl")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch_parser = commands.add_parser("batch", help="predict a CSV or Parquet file")
+    batch_parser.add_argument("input")
+    batch_parser.add_argument("--output", default="predictions.csv", help=".csv, .parquet or .xlsx")
+    batch_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    batch_parser.add_argument("--json", help="write the throughput report to this file")
+    stream_parser = commands.add_parser("stream", help="JSON lines on stdin to JSON lines on stdout")
+    stream_parser.add_argument("--chunk-size", type=int, default=1000)
+    stream_parser.add_argument("--max-wait-ms", type=float, default=50.0)
+    serve_parser = commands.add_parser("serve", help="answer POST /predict over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    predictor = Predictor(load_pipeline(args.model))
+
+    if args.command == "batch":
+        result = predict_file(predictor, args.input, args.output, args.chunk_size)
+        logging.info(f"{result['rows']} rows in {result['seconds']:.2f}s = {result['rows_per_sec']:.0f} rows/sec "
+                     f"(chunk p50 {result['chunk_p50_ms']:.1f} ms, p99 {result['chunk_p99_ms']:.1f} ms) -> {args.output}")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(result, f, indent=2)
+    elif args.command == "stream":
+        result = predict_stream(predictor, sys.stdin, sys.stdout, args.chunk_size, args.max_wait_ms)
+        logging.info(f"{result['rows']} records, {result['rows_per_sec']:.0f} rows/sec, "
+                     f"chunk p50 {result['chunk_p50_ms']:.1f} ms")
+    else:
+        predictor.predict([dict(zip(FEATURES, (1, "female", 31.0, 0, 0, 100, "S")))], "warmup")
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(predictor))
+        server.daemon_threads = True
+        logging.info("Predicting on http://%s:%s/predict", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()